@@ -10,62 +10,195 @@ https://github.com/luchko/QCodeEditor
 @author: Ivan Luchko (luchko.ivan@gmail.com)
 '''
 
+import time
+import itertools
+import threading
+
 import binaryninjaui
-from binaryninja import log_warn, bncompleter
+from binaryninja import log_warn
 if "qt_major_version" in binaryninjaui.__dict__ and binaryninjaui.qt_major_version == 6:
-    from PySide6.QtCore import Qt, QRect
+    from PySide6.QtCore import Qt, QRect, QPoint, QTimer, Signal, QEvent
     from PySide6.QtWidgets import QWidget, QPlainTextEdit
     from PySide6.QtGui import (QPainter, QFont, QSyntaxHighlighter, QTextCharFormat, QTextCursor)
 else:
-    from PySide2.QtCore import Qt, QRect
+    from PySide2.QtCore import Qt, QRect, QPoint, QTimer, Signal, QEvent
     from PySide2.QtWidgets import QWidget, QPlainTextEdit
     from PySide2.QtGui import (QPainter, QFont, QSyntaxHighlighter, QTextCharFormat, QTextCursor)
 from binaryninjaui import (getMonospaceFont, getThemeColor, ThemeColor)
+from .snippetlib.context import baseNamespace
+from .snippetlib.completion import SnippetCompleter
 try:
-    from pygments import highlight
+    import pygments
+except ImportError:
+    pygments = None
+if pygments is not None:
+    # Only the pygments import itself is optional, anything failing in here is a real error
     from pygments.lexers import *
     from pygments.formatter import Formatter
+    from pygments.token import Text, Whitespace
+    from .snippetlib.lexing import LineLexer, TokenFormats, formatSpans, lexLines
 
     class QFormatter(Formatter):
 
         def __init__(self):
             Formatter.__init__(self)
-            self.pygstyles={}
-            for token, style in self.style:
-                tokenname = str(token)
-                if tokenname in bnstyles.keys():
-                    self.pygstyles[str(token)]=bnstyles[tokenname]
-                    #log_warn("MATCH: %s with %s" % (tokenname, str(token)))
-                else:
-                    self.pygstyles[str(token)]=bnstyles['Token.Name']
-                    #log_warn("NONE: %s with %s" % (tokenname, str(token)))
+            # Token types without their own entry in bnstyles use their closest parent's
+            self.formats = TokenFormats(bnstyles, bnstyles['Token.Name'], (token for token, style in self.style))
+            # Only colors and font styles are set, which whitespace doesn't show
+            self.formats[Text] = None
+            self.formats[Whitespace] = None
 
-        def format(self, tokensource, outfile):
-            self.data=[]
-            for token, value in tokensource:
-                self.data.extend([self.pygstyles[str(token)],]*len(value))
+        def formatSpans(self, tokenSpans):
+            """(start, length, QTextCharFormat) for (start, length, tokentype) spans."""
+            return formatSpans(tokenSpans, self.formats)
 
     class Pylighter(QSyntaxHighlighter):
-
-        def __init__(self, parent, lang):
+        # Lexes only the block Qt asks for, starting from the lexer state the
+        # previous block ended in. Qt moves on to the next block by itself
+        # when a block's outgoing state changes.
+        #
+        # Documents of backgroundThreshold characters or more are lexed on a
+        # worker thread instead. Its results carry the generation of the text
+        # they were made from and are dropped if the document changed since,
+        # otherwise they're applied to the visible blocks first and to the
+        # rest a chunk per timer tick. Block states aren't used in that mode,
+        # so applying one block never makes Qt go on to the next.
+        lexed = Signal(int, object)
+        lexDelay = 100
+        chunkSeconds = 0.008
+
+        def __init__(self, parent, lang, editor=None):
             QSyntaxHighlighter.__init__(self, parent)
             self.formatter=QFormatter()
-            self.lexer=get_lexer_by_name(lang)
+            self.lexer=LineLexer(get_lexer_by_name(lang))
+            self.editor = editor
+            self.backgroundThreshold = 0
+            self.generation = 0
+            self.worker = None
+            # [(text, format spans, outgoing state)] per block from the last
+            # background run, and which of them each block currently shows
+            self.results = []
+            self.resultsGeneration = -1
+            self.shown = []
+            self.fillOrder = iter(())
+            self.applying = None
+            self.lexTimer = QTimer(self)
+            self.lexTimer.setSingleShot(True)
+            self.lexTimer.timeout.connect(self.startLexing)
+            self.applyTimer = QTimer(self)
+            self.applyTimer.setSingleShot(True)
+            self.applyTimer.timeout.connect(self.applyChunk)
+            self.lexed.connect(self.lexingFinished)
+            self.document().contentsChange.connect(self.contentsChanged)
+
+        def background(self):
+            return 0 < self.backgroundThreshold <= self.document().characterCount()
 
         def highlightBlock(self, text):
-            cb = self.currentBlock()
-            p = cb.position()
-            text=self.document().toPlainText()+' \n'
-            highlight(text,self.lexer,self.formatter)
-
-            #dirty, dirty hack
-            for i in range(len(text)):
-                try:
-                    self.setFormat(i,1,self.formatter.data[p+i])
-                except IndexError:
-                    pass
-
-except:
+            if not self.background():
+                (spans, state) = self.lexer.lexLine(text, max(self.previousBlockState(), 0))
+                for (start, length, format) in self.formatter.formatSpans(spans):
+                    self.setFormat(start, length, format)
+                self.setCurrentBlockState(state)
+                return
+            number = self.currentBlock().blockNumber()
+            if number == self.applying:
+                entry = self.results[number]
+                spans = entry[1]
+                self.shown[number] = entry
+            else:
+                spans = self.interimSpans(number, text)
+                if number < len(self.shown):
+                    self.shown[number] = None
+            for (start, length, format) in spans:
+                self.setFormat(start, length, format)
+
+        def interimSpans(self, number, text):
+            # Until the worker catches up with an edit: reuse what it made of
+            # this line, or lex the line on the spot if the one above is known
+            results = self.results
+            if number < len(results) and results[number][0] == text:
+                return results[number][1]
+            if number == 0:
+                state = 0
+            elif number <= len(results) and results[number - 1][0] == self.currentBlock().previous().text():
+                state = results[number - 1][2]
+            else:
+                return ()
+            return self.formatter.formatSpans(self.lexer.lexLine(text, state)[0])
+
+        def contentsChanged(self, position, removed, added):
+            self.generation += 1
+            blockCount = self.document().blockCount()
+            if len(self.shown) != blockCount:
+                self.shown = [None] * blockCount
+            if self.background():
+                self.lexTimer.start(self.lexDelay)
+            elif self.results:
+                # Back under the threshold, block states need redoing from the top
+                self.results = []
+                self.resultsGeneration = -1
+                QTimer.singleShot(0, self.rehighlight)
+
+        def startLexing(self):
+            if self.worker is not None and self.worker.is_alive():
+                # It gives up shortly, as the generation it lexes is gone
+                self.lexTimer.start(self.lexDelay)
+                return
+            generation = self.generation
+            lines = self.document().toRawText().split("\u2029")
+            self.worker = threading.Thread(target=self.lex, args=(generation, lines), daemon=True)
+            self.worker.start()
+
+        def lex(self, generation, lines):
+            results = lexLines(self.lexer, lines, self.formatter.formats, lambda: self.generation != generation)
+            if results is None:
+                return
+            try:
+                self.lexed.emit(generation, results)
+            except RuntimeError:
+                # The editor was closed in the meantime
+                pass
+
+        def lexingFinished(self, generation, results):
+            if generation != self.generation:
+                return
+            self.results = results
+            self.resultsGeneration = generation
+            (first, last) = self.visibleRange()
+            self.fillOrder = itertools.chain(range(last, len(results)), range(0, first))
+            self.applyChunk()
+
+        def visibleRange(self):
+            if self.editor is None:
+                return (0, 0)
+            viewport = self.editor.viewport()
+            first = self.editor.firstVisibleBlock().blockNumber()
+            last = self.editor.cursorForPosition(QPoint(0, viewport.height() - 1)).blockNumber() + 1
+            return (max(first, 0), last)
+
+        def applyChunk(self):
+            if self.resultsGeneration != self.generation:
+                return
+            # The visible blocks go first on every tick, in case of scrolling
+            (first, last) = self.visibleRange()
+            for number in range(first, min(last, len(self.results))):
+                self.applyBlock(number)
+            deadline = time.perf_counter() + self.chunkSeconds
+            for number in self.fillOrder:
+                self.applyBlock(number)
+                if time.perf_counter() >= deadline:
+                    self.applyTimer.start(0)
+                    return
+
+        def applyBlock(self, number):
+            if self.shown[number] == self.results[number]:
+                return
+            self.applying = number
+            self.rehighlightBlock(self.document().findBlockByNumber(number))
+            self.applying = None
+
+else:
     log_warn("Pygments not installed, no syntax highlighting enabled.")
     Pylighter=None
 
@@ -150,47 +283,74 @@ bnstyles = {
 
 class QCodeEditor(QPlainTextEdit):
     class NumberBar(QWidget):
+        # Caches the positions of the visible lines between paints. The cache
+        # is dropped after a scroll, a relayout, a resize or a font change.
+        # Update requests that neither scroll nor cover the whole viewport,
+        # such as a blinking cursor or typing within a line, leave the gutter
+        # alone.
 
         def __init__(self, editor):
             QWidget.__init__(self, editor)
             global bnstyles
 
             self.editor = editor
-            self.editor.blockCountChanged.connect(self.updateWidth)
+            self.editor.blockCountChanged.connect(self.blockCountChanged)
             self.editor.updateRequest.connect(self.updateContents)
-            self.font = editor.currentCharFormat().font()
+            self.editor.cursorPositionChanged.connect(self.cursorMoved)
+            self.updateFonts()
             self.numberBarColor = bnstyles["numberBar"]
+            self.lines = None
+            self.currentLine = self.editor.textCursor().blockNumber()
             self.updateWidth()
 
+        def updateFonts(self):
+            self.font = QFont(self.editor.font())
+            self.boldFont = QFont(self.font)
+            self.boldFont.setBold(True)
+            self.lineHeight = self.editor.fontMetrics().height()
+
+        def visibleLines(self):
+            """[(top, block number)] of the blocks in view."""
+            lines = []
+            editor = self.editor
+            block = editor.firstVisibleBlock()
+            blockNumber = block.blockNumber()
+            top = editor.blockBoundingGeometry(block).translated(editor.contentOffset()).top()
+            bottom = editor.viewport().height()
+            while block.isValid() and block.isVisible() and top < bottom:
+                lines.append((int(top), blockNumber))
+                top += editor.blockBoundingRect(block).height()
+                block = block.next()
+                blockNumber += 1
+            return lines
+
         def paintEvent(self, event):
             painter = QPainter(self)
-            painter.fillRect(event.rect(), self.numberBarColor)
-
-            block = self.editor.firstVisibleBlock()
-
-            # Iterate over all visible text blocks in the document.
-            while block.isValid():
-                blockNumber = block.blockNumber()
-                block_top = self.editor.blockBoundingGeometry(block).translated(self.editor.contentOffset()).top()
-
-                # Check if the position of the block is out side of the visible area.
-                if not block.isVisible() or block_top >= event.rect().bottom():
+            rect = event.rect()
+            painter.fillRect(rect, self.numberBarColor)
+            if self.lines is None:
+                self.lines = self.visibleLines()
+
+            width = self.width()
+            height = self.lineHeight
+            painter.setFont(self.font)
+            painter.setPen(bnstyles["blockNormal"])
+            for (top, blockNumber) in self.lines:
+                if top + height <= rect.top():
+                    continue
+                if top > rect.bottom():
                     break
-
-                # We want the line number for the selected line to be bold.
-                if blockNumber == self.editor.textCursor().blockNumber():
-                    self.font.setBold(True)
+                # Draw the line number left justified at the position of the line, the selected line in bold.
+                paint_rect = QRect(0, top, width, height)
+                label = str(blockNumber + 3) # Offset so that the lines are correct to the file
+                if blockNumber == self.currentLine:
+                    painter.setFont(self.boldFont)
                     painter.setPen(bnstyles["blockSelected"])
-                else:
-                    self.font.setBold(False)
+                    painter.drawText(paint_rect, Qt.AlignLeft, label)
+                    painter.setFont(self.font)
                     painter.setPen(bnstyles["blockNormal"])
-                painter.setFont(self.font)
-
-                # Draw the line number left justified at the position of the line.
-                paint_rect = QRect(0, block_top, self.width(), self.editor.fontMetrics().height())
-                painter.drawText(paint_rect, Qt.AlignLeft, str(blockNumber + 3)) # Offset so that the lines are correct to the file
-
-                block = block.next()
+                else:
+                    painter.drawText(paint_rect, Qt.AlignLeft, label)
 
             painter.end()
 
@@ -207,14 +367,50 @@ class QCodeEditor(QPlainTextEdit):
                 self.setFixedWidth(width)
                 self.editor.setViewportMargins(width, 0, 0, 0)
 
+        def blockCountChanged(self):
+            self.updateWidth()
+            self.lines = None
+            self.update()
+
+        def updateLine(self, blockNumber):
+            if self.lines is None:
+                self.update()
+                return
+            for (top, number) in self.lines:
+                if number == blockNumber:
+                    self.update(0, top, self.width(), self.lineHeight)
+                    return
+
+        def cursorMoved(self):
+            blockNumber = self.editor.textCursor().blockNumber()
+            if blockNumber != self.currentLine:
+                self.updateLine(self.currentLine)
+                self.currentLine = blockNumber
+                self.updateLine(blockNumber)
+
         def updateContents(self, rect, scroll):
             if scroll:
+                self.lines = None
                 self.scroll(0, scroll)
-            else:
-                self.update(0, rect.y(), self.width(), rect.height())
+            elif rect.contains(self.editor.viewport().rect()):
+                # A full relayout or a horizontal scroll, anything smaller
+                # leaves the line numbers where they are
+                self.lines = None
+                self.update()
+                self.updateWidth()
+
+        def resizeEvent(self, event):
+            self.lines = None
+            QWidget.resizeEvent(self, event)
 
-            if rect.contains(self.editor.viewport().rect()):
+        def changeEvent(self, event):
+            # The bar inherits the editor's font, so this also follows editor.setFont()
+            if event.type() == QEvent.FontChange:
+                self.updateFonts()
+                self.lines = None
                 self.updateWidth()
+                self.update()
+            QWidget.changeEvent(self, event)
 
 
     def __init__(self, DISPLAY_LINE_NUMBERS=True, HIGHLIGHT_CURRENT_LINE=True,
@@ -228,7 +424,7 @@ class QCodeEditor(QPlainTextEdit):
         self.completionState = 0
         self.completing = False
         self.delimeter = delimeter
-        self.completer = bncompleter.Completer()
+        self.completer = SnippetCompleter(baseNamespace)
         self.cursorPositionChanged.connect(self.resetCompletion)
 
         self.DISPLAY_LINE_NUMBERS = DISPLAY_LINE_NUMBERS
@@ -236,8 +432,9 @@ class QCodeEditor(QPlainTextEdit):
         if DISPLAY_LINE_NUMBERS:
             self.number_bar = self.NumberBar(self)
 
+        self.highlighter = None
         if SyntaxHighlighter is not None: # add highlighter to textdocument
-            self.highlighter = SyntaxHighlighter(self.document(), lang)
+            self.highlighter = SyntaxHighlighter(self.document(), lang, self)
 
     def resetCompletion(self):
         if not self.completing:
@@ -332,8 +529,6 @@ class QCodeEditor(QPlainTextEdit):
                     self.replaceBlockAtCursor(self.origText)
                 newText = self.completer.complete(self.origText, self.completionState)
                 if newText:
-                    if newText.find("(") > 0:
-                        newText = newText[0:newText.find("(") + 1]
                     self.completionState += 1
                     self.replaceBlockAtCursor(newText)
                 else:
@@ -5,26 +5,46 @@ import os
 import shutil
 import codecs
 import getpass
+import traceback
+import time
+import threading
+import hashlib
 from collections import namedtuple
 from datetime import datetime
 from pathlib import Path
 
-from binaryninja import user_plugin_path, core_version, execute_on_main_thread_and_wait
+from binaryninja import user_plugin_path, core_version, execute_on_main_thread, execute_on_main_thread_and_wait
 from binaryninja.plugin import BackgroundTaskThread
-from binaryninja.log import (log_error, log_debug, log_alert, log_warn)
+from binaryninja.binaryview import BinaryDataNotification
+from binaryninja.log import (log_error, log_debug, log_alert, log_warn, log_info)
 from binaryninja.settings import Settings
-from binaryninja.interaction import get_directory_name_input
+from binaryninja.interaction import get_directory_name_input, show_markdown_report
 from binaryninja.variable import Variable
 from binaryninja.enums import FunctionGraphType
-from binaryninjaui import (getMonospaceFont, UIAction, UIActionHandler, Menu, UIContext)
-from PySide6.QtWidgets import (QLineEdit, QPushButton, QApplication, QWidget,
+from binaryninjaui import (getMonospaceFont, UIAction, UIActionHandler, Menu, UIContext, UIContextNotification)
+from PySide6.QtWidgets import (QLineEdit, QPushButton, QApplication, QWidget, QPlainTextEdit,
      QVBoxLayout, QHBoxLayout, QDialog, QFileSystemModel, QTreeView, QLabel, QSplitter,
-     QInputDialog, QMessageBox, QHeaderView, QKeySequenceEdit, QCheckBox, QMenu, QAbstractItemView)
+     QInputDialog, QMessageBox, QHeaderView, QKeySequenceEdit, QCheckBox, QMenu, QAbstractItemView,
+     QTreeWidget, QTreeWidgetItem)
 from PySide6.QtCore import (QDir, Qt, QFileInfo, QItemSelectionModel, QSettings, QUrl,
-                            QFileSystemWatcher, QObject, Signal, Slot)
+                            QFileSystemWatcher, QObject, Signal, Slot, QTimer, QSortFilterProxyModel, QModelIndex)
 from PySide6.QtGui import (QFontMetrics, QDesktopServices, QKeySequence, QIcon, QColor, QAction,
-                           QCursor, QGuiApplication)
+                           QCursor, QGuiApplication, QTextCursor)
 from .QCodeEditor import QCodeEditor, Pylighter
+from .snippetlib.snippetfile import readSnippetFile, parseDirectives, setDirective
+from .snippetlib.registry import SnippetRegistry
+from .snippetlib.codecache import CodeCache, CompiledSnippet, headerPadding
+from .snippetlib.walker import walkSnippets
+from .snippetlib.manifest import loadManifest, saveManifest
+from .snippetlib.context import LazyGlobals, contextTimingReport, baseNamespace, functionGlobals
+from .snippetlib.fanout import runForEach, formatReport
+from .snippetlib.profiling import profiledExec, saveProfile, hotSpots
+from .snippetlib.scheduler import SnippetScheduler, AnalysisUpdates
+from .snippetlib.watchdog import Watchdog, SnippetAborted
+from .snippetlib.history import RunHistory, RunRecord
+from .snippetlib.undo import UndoPolicy, parseUndoPolicy, defaultUndoPolicy, mutatingCalls
+from .snippetlib.pipeline import loadPipelines, pipelineFileName
+from .snippetlib.resultcache import ResultCache, usesLocation
 
 Settings().register_group("snippets", "Snippets")
 Settings().register_setting("snippets.syntaxHighlight", """
@@ -32,7 +52,18 @@ Settings().register_setting("snippets.syntaxHighlight", """
         "title" : "Syntax Highlighting",
         "type" : "boolean",
         "default" : true,
-        "description" : "Whether to syntax highlight (may be performance problems with very large snippets and the current highlighting implementation.)",
+        "description" : "Whether to syntax highlight snippets in the editor.",
+        "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
+    }
+    """)
+Settings().register_setting("snippets.backgroundHighlightThreshold", """
+    {
+        "title" : "Background Highlighting Threshold",
+        "type" : "number",
+        "default" : 100000,
+        "minValue" : 0,
+        "maxValue" : 100000000,
+        "description" : "Snippets of at least this many characters are syntax highlighted on a background thread, visible lines first, so that opening them doesn't block the UI. 0 always highlights on the UI thread.",
         "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
     }
     """)
@@ -45,9 +76,97 @@ Settings().register_setting("snippets.indentation", """
         "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
     }
     """)
+Settings().register_setting("snippets.maxFolderDepth", """
+    {
+        "title" : "Maximum Snippet Folder Depth",
+        "type" : "number",
+        "default" : 0,
+        "minValue" : 0,
+        "maxValue" : 64,
+        "description" : "How many levels of sub-folders to search for snippets, 0 for no limit. Folders can also be skipped by listing glob patterns in a .snippetignore file in the snippet folder.",
+        "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
+    }
+    """)
+Settings().register_setting("snippets.reloadDelay", """
+    {
+        "title" : "Snippet Reload Delay",
+        "type" : "number",
+        "default" : 250,
+        "minValue" : 0,
+        "maxValue" : 10000,
+        "description" : "Milliseconds to wait after the last change in the snippet folder before reloading snippets, so that bulk updates (git pull, the example updater) only reload once.",
+        "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
+    }
+    """)
+Settings().register_setting("snippets.maxConcurrentRuns", """
+    {
+        "title" : "Maximum Concurrent Snippet Runs",
+        "type" : "number",
+        "default" : 4,
+        "minValue" : 1,
+        "maxValue" : 64,
+        "description" : "How many snippets may run at the same time. Runs against the same file always wait for each other, and a snippet already waiting to run is not queued twice.",
+        "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
+    }
+    """)
+Settings().register_setting("snippets.timeLimit", """
+    {
+        "title" : "Snippet Time Budget",
+        "type" : "number",
+        "default" : 0,
+        "minValue" : 0,
+        "maxValue" : 86400,
+        "description" : "Seconds a snippet may run before it is stopped and its changes are undone (0 for no limit). A snippet can override this with a '# snippet: timeout=N' line at the top of its code.",
+        "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
+    }
+    """)
+Settings().register_setting("snippets.memoryLimit", """
+    {
+        "title" : "Snippet Memory Budget",
+        "type" : "number",
+        "default" : 0,
+        "minValue" : 0,
+        "maxValue" : 1048576,
+        "description" : "MiB of Python allocations a snippet may make before it is stopped and its changes are undone (0 for no limit). Tracking memory slows snippets down. A snippet can override this with a '# snippet: memory=N' line at the top of its code.",
+        "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
+    }
+    """)
+Settings().register_setting("snippets.bytecodeCache", """
+    {
+        "title" : "Cache Compiled Snippets On Disk",
+        "type" : "boolean",
+        "default" : false,
+        "description" : "Store compiled snippets in a hidden .snippetcache folder inside the snippet folder so they are not recompiled after a restart.",
+        "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
+    }
+    """)
+Settings().register_setting("snippets.resultCacheSize", """
+    {
+        "title" : "Cached Snippet Results",
+        "type" : "number",
+        "default" : 64,
+        "minValue" : 0,
+        "maxValue" : 4096,
+        "description" : "How many results of snippets marked '# snippet: cacheable' to keep (0 to turn caching off). A result is reused while the snippet, the view, its analysis and (if the snippet uses it) the cursor location are unchanged. Hold Shift when running a snippet to ignore its cached result.",
+        "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
+    }
+    """)
+Settings().register_setting("snippets.recordMemoryPeak", """
+    {
+        "title" : "Record Peak Memory Of Snippet Runs",
+        "type" : "boolean",
+        "default" : false,
+        "description" : "Measure the peak Python allocation of every snippet run for the run history. Tracking memory slows snippets down, runs with a memory budget are always measured.",
+        "ignore" : ["SettingsProjectScope", "SettingsResourceScope"]
+    }
+    """)
 
 
 snippetPath = os.path.realpath(os.path.join(user_plugin_path(), "..", "snippets"))
+manifestPath = os.path.join(os.path.dirname(snippetPath), "snippets_manifest.json")
+profilePath = os.path.join(snippetPath, ".profiles")
+historyPath = os.path.join(os.path.dirname(snippetPath), "snippets_history.jsonl")
+pipelinePath = os.path.join(snippetPath, pipelineFileName)
 try:
     if not os.path.exists(snippetPath):
         os.mkdir(snippetPath)
@@ -61,31 +180,19 @@ except IOError:
     log_error("Unable to create %s or unable to add example updater, please report this bug" % snippetPath)
 
 
-def includeWalk(dir, includeExt):
-    filePaths = []
-    for (root, dirs, files) in os.walk(dir):
-        for f in files:
-            if os.path.splitext(f)[1] in includeExt and '.git' not in root:
-                filePaths.append(os.path.join(root, f))
-    return filePaths
+def snippetFiles():
+    maxDepth = Settings().get_integer("snippets.maxFolderDepth")
+    return walkSnippets(snippetPath, maxDepth=maxDepth if maxDepth > 0 else None)
 
 
 def loadSnippetFromFile(snippetPath):
-    try:
-        with codecs.open(snippetPath, 'r', 'utf-8') as snippetFile:
-            snippetText = snippetFile.readlines()
-    except:
-        return ("", "", "")
-    if (len(snippetText) < 3):
+    (snippetDescription, snippetKeys, snippetCode) = readSnippetFile(snippetPath)
+    if not snippetCode:
         return ("", "", "")
-    else:
-        qKeySequence = QKeySequence(snippetText[1].strip()[1:])
-        if qKeySequence.isEmpty():
-            qKeySequence = None
-        return (snippetText[0].strip()[1:].strip(),
-                qKeySequence,
-                ''.join(snippetText[2:])
-        )
+    qKeySequence = QKeySequence(snippetKeys)
+    if qKeySequence.isEmpty():
+        qKeySequence = None
+    return (snippetDescription, qKeySequence, snippetCode)
 
 
 def actionFromSnippet(snippetName, snippetDescription):
@@ -97,52 +204,69 @@ def actionFromSnippet(snippetName, snippetDescription):
     else:
         return "Snippets\\" + snippetDescription
 
+def activeILFunction(function, ilType):
+    if not function:
+        return None
+    if ilType == FunctionGraphType.LowLevelILFunctionGraph and function.llil_if_available:
+        return function.llil_if_available
+    elif ilType == FunctionGraphType.LowLevelILSSAFormFunctionGraph and function.llil_if_available:
+        return function.llil_if_available.ssa_form
+    elif ilType == FunctionGraphType.MediumLevelILFunctionGraph and function.mlil_if_available:
+        return function.mlil_if_available
+    elif ilType == FunctionGraphType.MediumLevelILSSAFormFunctionGraph and function.mlil_if_available:
+        return function.mlil_if_available.ssa_form
+    elif ilType == FunctionGraphType.HighLevelILFunctionGraph and function.hlil_if_available:
+        return function.hlil_if_available
+    elif ilType == FunctionGraphType.HighLevelILSSAFormFunctionGraph and function.hlil_if_available:
+        return function.hlil_if_available.ssa_form
+    return None
+
+
 def setupGlobals(uiactioncontext, uicontext):
-    snippetGlobals = {}
-    snippetGlobals['current_view'] = uiactioncontext.binaryView
-    snippetGlobals['bv'] = uiactioncontext.binaryView
+    # Anything touching the UI is captured here on the main thread. Values that
+    # need analysis (IL, basic blocks, variables) are only computed when the
+    # snippet first uses them, on the snippet's own thread.
+    snippetGlobals = LazyGlobals()
+    bv = uiactioncontext.binaryView
+    function = uiactioncontext.function
+    address = uiactioncontext.address
+    snippetGlobals['current_view'] = bv
+    snippetGlobals['bv'] = bv
     snippetGlobals['current_token'] = None
-    snippetGlobals['current_hlil'] = None
-    snippetGlobals['current_mlil'] = None
     snippetGlobals['current_function'] = None
-    snippetGlobals['current_llil'] = None
 
-    action_handler = None
     view_frame = None
     view = None
     if uicontext is not None:
-        action_handler = uicontext.getCurrentActionHandler()
         view_frame = uicontext.getCurrentViewFrame()
         view = uicontext.getCurrentView()
 
     view_location = view_frame.getViewLocation() if view_frame is not None else None
 
+    il_start = None
     if view is not None:
-        snippetGlobals['current_il_index'] = view.getSelectionStartILInstructionIndex()
-
-    view_location = view_frame.getViewLocation() if view_frame is not None else None
-
-    if uiactioncontext.function:
-        snippetGlobals['current_function'] = uiactioncontext.function
-        snippetGlobals['current_mlil'] = uiactioncontext.function.mlil_if_available
-        snippetGlobals['current_hlil'] = uiactioncontext.function.hlil_if_available
-        snippetGlobals['current_llil'] = uiactioncontext.function.llil_if_available
+        il_start = view.getSelectionStartILInstructionIndex()
+        snippetGlobals['current_il_index'] = il_start
+
+    snippetGlobals.lazy(['current_mlil'], lambda: {'current_mlil': function.mlil_if_available if function else None})
+    snippetGlobals.lazy(['current_hlil'], lambda: {'current_hlil': function.hlil_if_available if function else None})
+    snippetGlobals.lazy(['current_llil'], lambda: {'current_llil': function.llil_if_available if function else None})
+    snippetGlobals.lazy(['current_basic_block'], lambda: {'current_basic_block': function.get_basic_block_at(address) if function else None})
+    if function:
+        snippetGlobals['current_function'] = function
         if uiactioncontext.token:
             # Doubly nested because the first token is a HighlightTokenState
             snippetGlobals['current_token'] = uiactioncontext.token
-        snippetGlobals['current_basic_block'] = uiactioncontext.function.get_basic_block_at(uiactioncontext.address)
-    else:
-        snippetGlobals['current_basic_block'] = None
 
-    snippetGlobals['current_address'] = uiactioncontext.address
-    if uiactioncontext.binaryView is not None and uiactioncontext.address is not None:
-        snippetGlobals['current_raw_offset'] = uiactioncontext.binaryView.get_data_offset_for_address(uiactioncontext.address)
+    snippetGlobals['current_address'] = address
+    if bv is not None and address is not None:
+        snippetGlobals.lazy(['current_raw_offset'], lambda: {'current_raw_offset': bv.get_data_offset_for_address(address)})
     else:
         snippetGlobals['current_raw_offset'] = None
 
-    snippetGlobals['here'] = uiactioncontext.address
-    if uiactioncontext.address is not None and isinstance(uiactioncontext.length, int):
-        snippetGlobals['current_selection'] = (uiactioncontext.address, uiactioncontext.address+uiactioncontext.length)
+    snippetGlobals['here'] = address
+    if address is not None and isinstance(uiactioncontext.length, int):
+        snippetGlobals['current_selection'] = (address, address+uiactioncontext.length)
     else:
         snippetGlobals['current_selection'] = None
     snippetGlobals['current_ui_action_context'] = uiactioncontext
@@ -151,57 +275,40 @@ def setupGlobals(uiactioncontext, uicontext):
     if view_location is not None and view_location.isValid():
         active_il_index = view_location.getInstrIndex()
         ilType = view_location.getILViewType().view_type
-        active_il_function = None
-        if ilType == FunctionGraphType.LowLevelILFunctionGraph and uiactioncontext.function and uiactioncontext.function.llil_if_available:
-            active_il_function = uiactioncontext.function.llil_if_available
-        elif ilType == FunctionGraphType.LowLevelILSSAFormFunctionGraph and uiactioncontext.function and uiactioncontext.function.llil_if_available:
-            active_il_function = uiactioncontext.function.llil_if_available.ssa_form
-        elif ilType == FunctionGraphType.MediumLevelILFunctionGraph and uiactioncontext.function and uiactioncontext.function.mlil_if_available:
-            active_il_function = uiactioncontext.function.mlil_if_available
-        elif ilType == FunctionGraphType.MediumLevelILSSAFormFunctionGraph and uiactioncontext.function and uiactioncontext.function.mlil_if_available:
-            active_il_function = uiactioncontext.function.mlil_if_available.ssa_form
-        elif ilType == FunctionGraphType.HighLevelILFunctionGraph and uiactioncontext.function and uiactioncontext.function.hlil_if_available:
-            active_il_function = uiactioncontext.function.hlil_if_available
-        elif ilType == FunctionGraphType.HighLevelILSSAFormFunctionGraph and uiactioncontext.function and uiactioncontext.function.hlil_if_available:
-            active_il_function = uiactioncontext.function.hlil_if_available.ssa_form
-
-        if active_il_function:
-            il_start = view.getSelectionStartILInstructionIndex()
-
-            snippetGlobals['current_il_function'] = active_il_function
+
+        def activeIL():
+            active_il_function = activeILFunction(function, ilType)
+            if not active_il_function:
+                return {'current_il_function': None, 'current_il_instruction': None,
+                        'current_il_basic_block': None, 'current_il_instructions': None}
             if active_il_index == 0xffffffffffffffff:
                 # Invalid index
-                snippetGlobals['current_il_instruction'] = None
-                snippetGlobals["current_il_basic_block"] = None
-                snippetGlobals['current_il_instructions'] = None
-            else:
-                snippetGlobals['current_il_instruction'] = active_il_function[active_il_index]
-                snippetGlobals["current_il_basic_block"] = active_il_function[active_il_index].il_basic_block
-                snippetGlobals['current_il_instructions'] = (active_il_function[i] for i in range(
-                    min(il_start, active_il_index),
-                    max(il_start, active_il_index) + 1)
-                )
-        else:
-            snippetGlobals['current_il_function'] = None
-            snippetGlobals['current_il_instruction'] = None
-            snippetGlobals["current_il_basic_block"] = None
-            snippetGlobals['current_il_instructions'] = None
-
-        var = None
-        if uiactioncontext is not None:
-            token_state = uiactioncontext.token
-            token = token_state.token if token_state.valid else None
-            var = token_state.localVar if token_state.localVarValid else None
-            if var and uiactioncontext.function:
-                var = Variable.from_core_variable(uiactioncontext.function, var)
-
-        snippetGlobals['current_variable'] = var
+                return {'current_il_function': active_il_function, 'current_il_instruction': None,
+                        'current_il_basic_block': None, 'current_il_instructions': None}
+            return {'current_il_function': active_il_function,
+                    'current_il_instruction': active_il_function[active_il_index],
+                    'current_il_basic_block': active_il_function[active_il_index].il_basic_block,
+                    'current_il_instructions': (active_il_function[i] for i in range(
+                        min(il_start, active_il_index),
+                        max(il_start, active_il_index) + 1)
+                    )}
+        snippetGlobals.lazy(['current_il_function', 'current_il_instruction', 'current_il_basic_block', 'current_il_instructions'], activeIL)
+
+        token_state = uiactioncontext.token
+        token = token_state.token if token_state.valid else None
+        var = token_state.localVar if token_state.localVarValid else None
+
+        def currentVariable():
+            if var and function:
+                return {'current_variable': Variable.from_core_variable(function, var)}
+            return {'current_variable': var}
+        snippetGlobals.lazy(['current_variable'], currentVariable)
         snippetGlobals['current_token'] = token
 
     return snippetGlobals
 
 
-def executeSnippet(code, description):
+def currentContext():
     #Get UI context, try currently selected otherwise default to the first one if the snippet widget is selected.
     ctx = UIContext.activeContext()
     dummycontext = {'binaryView': None, 'address': None, 'function': None, 'token': None, 'lowLevelILFunction': None, 'mediumLevelILFunction': None}
@@ -217,23 +324,163 @@ def executeSnippet(code, description):
             context = handler.actionContext()
         else:
             context = namedtuple("context", dummycontext.keys())(*dummycontext.values())
+    return (context, ctx)
+
 
+def executeSnippet(compiled, source, description, forEachFunction=False, profile=False, forceRerun=False):
+    (context, ctx) = currentContext()
     snippetGlobals = setupGlobals(context, ctx)
 
-    SnippetTask(code, snippetGlobals, context, snippetName=description).start()
+    if compiled.options.get("undo") == "none":
+        checkReadOnly(compiled, source, description)
+    if "cacheable" in compiled.options:
+        trackAnalysis(context.binaryView)
+    if forEachFunction or compiled.options.get("foreach") == "function":
+        task = SnippetFanOutTask(compiled, snippetGlobals, context, source, snippetName=description, forceRerun=forceRerun)
+        key = description + " (each function)"
+    else:
+        task = SnippetTask(compiled, snippetGlobals, context, source, snippetName=description, profile=profile, forceRerun=forceRerun)
+        key = description + " (profiled)" if profile else description
+    snippetScheduler.maxConcurrent = Settings().get_integer("snippets.maxConcurrentRuns")
+    snippetScheduler.submit(key, description, viewKey(context.binaryView), task.startScheduled)
+
+
+def executePipeline(name, stages, forceRerun=False):
+    compiledStages = []
+    for stage in stages:
+        try:
+            compiledStages.append((stage, loadCompiled(stage)))
+        except OSError:
+            log_error("Snippets: Unable to load %s for pipeline %s" % (stage, name))
+            return
+    (context, ctx) = currentContext()
+    if any("cacheable" in compiled.options for (_, compiled) in compiledStages):
+        trackAnalysis(context.binaryView)
+    actionText = pipelineAction(name)
+    task = SnippetPipelineTask(compiledStages, setupGlobals(context, ctx), context, "%s#%s" % (pipelinePath, name),
+                               snippetName=actionText, forceRerun=forceRerun)
+    snippetScheduler.maxConcurrent = Settings().get_integer("snippets.maxConcurrentRuns")
+    snippetScheduler.submit(actionText, actionText, viewKey(context.binaryView), task.startScheduled)
+
+
+# Content hashes of undo=none snippets that were already checked
+checkedReadOnly = set()
+
+def checkReadOnly(compiled, source, description):
+    if compiled.contentHash in checkedReadOnly:
+        return
+    checkedReadOnly.add(compiled.contentHash)
+    try:
+        body = readSnippetFile(source)[2]
+    except OSError:
+        return
+    calls = mutatingCalls(headerPadding + body)
+    if calls:
+        found = ", ".join("%s on line %d" % (what, line) for (line, what) in calls[:10])
+        log_warn("Snippets: %s is marked undo=none but seems to modify the database (%s), those changes can't be undone" % (description, found))
+
+
+def viewKey(bv):
+    # Undo actions belong to the FileMetadata, so serialize per file rather than per view
+    if bv is None:
+        return None
+    return bv.file.session_id
 
 
 lastSnippet = None
-def makeSnippetFunction(snippet):
+codeCache = CodeCache()
+def loadCompiled(snippet):
+    codeCache.storeDir = os.path.join(snippetPath, ".snippetcache") if Settings().get_bool("snippets.bytecodeCache") else None
+    return codeCache.get(snippet)
+
+
+class AnalysisGeneration(BinaryDataNotification):
+    """Counts changes to a view, cached snippet results are only reused within one generation."""
+
+    def __init__(self):
+        BinaryDataNotification.__init__(self)
+        self.generation = 0
+
+    def changed(self, *args):
+        self.generation += 1
+
+    data_written = data_inserted = data_removed = changed
+    function_added = function_removed = function_updated = changed
+    data_var_added = data_var_removed = data_var_updated = changed
+    symbol_added = symbol_removed = symbol_updated = changed
+    type_defined = type_undefined = changed
+    tag_added = tag_removed = tag_updated = changed
+
+
+# (view, AnalysisGeneration) per viewKey, registered the first time a cacheable
+# snippet runs against a view while caching is on, until the file is closed
+analysisGenerations = {}
+analysisLock = threading.Lock()
+resultCache = ResultCache()
+
+def trackAnalysis(bv):
+    if Settings().get_integer("snippets.resultCacheSize") <= 0:
+        # Caching was turned off, nothing needs to count changes any more
+        for key in list(analysisGenerations):
+            untrackAnalysis(key)
+        return
+    with analysisLock:
+        if bv is None or viewKey(bv) in analysisGenerations:
+            return
+        tracker = AnalysisGeneration()
+        bv.register_notification(tracker)
+        analysisGenerations[viewKey(bv)] = (bv, tracker)
+
+
+def untrackAnalysis(key):
+    with analysisLock:
+        entry = analysisGenerations.pop(key, None)
+    if entry is None:
+        return
+    (bv, tracker) = entry
+    bv.unregister_notification(tracker)
+    resultCache.discard(lambda resultKey: resultKey[1] == key)
+
+
+def analysisGeneration(bv):
+    """The view's current analysis generation, None if its changes aren't being counted."""
+    entry = analysisGenerations.get(viewKey(bv)) if bv is not None else None
+    return entry[1].generation if entry is not None else None
+
+
+class AnalysisTrackingCleanup(UIContextNotification):
+    """Stops counting a view's changes, and drops its cached results, once its file is closed."""
+
+    def OnAfterCloseFile(self, context, file, frame):
+        try:
+            untrackAnalysis(file.getMetadata().session_id)
+        except Exception:
+            log_error(traceback.format_exc())
+
+analysisTrackingCleanup = AnalysisTrackingCleanup()
+UIContext.registerNotification(analysisTrackingCleanup)
+
+
+def forceRerunHeld(snippet):
+    # Shift is part of some hotkeys, only treat it as "force" for the others
+    entry = snippetRegistry.get(snippet)
+    if entry is not None and "shift" in entry.hotkey.lower():
+        return False
+    return bool(QGuiApplication.queryKeyboardModifiers() & Qt.ShiftModifier)
+
+
+def makeSnippetFunction(snippet, forEachFunction=False, profile=False, forceRerun=False):
     def execute():
         global lastSnippet
         lastSnippet = snippet
 
-        (snippetDescription, snippetKeys, snippetCode) = loadSnippetFromFile(snippet)
-        snippetCode = "# \n# \n" + snippetCode
-        snippetCode = compile(snippetCode, snippet, 'exec')
-        actionText = actionFromSnippet(snippet, snippetDescription)
-        executeSnippet(snippetCode, actionText)
+        try:
+            compiled = loadCompiled(snippet)
+        except OSError:
+            log_error("Snippets: Unable to load %s" % snippet)
+            return
+        actionText = actionFromSnippet(snippet, compiled.description)
+        executeSnippet(compiled, snippet, actionText, forEachFunction, profile, forceRerun or forceRerunHeld(snippet))
     return lambda context: execute()
 
 
@@ -243,24 +490,308 @@ def rerunLastSnippet(context):
         makeSnippetFunction(lastSnippet)(context)
 
 
-# Global variable to indicate if analysis should be updated after a snippet is run
-gUpdateAnalysisOnRun = False
+def rerunLastSnippetWithoutCache(context):
+    if lastSnippet is not None:
+        makeSnippetFunction(lastSnippet, forceRerun=True)(context)
+
+
+def rerunLastSnippetWithProfiler(context):
+    if lastSnippet is not None:
+        makeSnippetFunction(lastSnippet, profile=True)(context)
+
+
+def runLastSnippetForEachFunction(context):
+    if lastSnippet is not None:
+        makeSnippetFunction(lastSnippet, forEachFunction=True)(context)
+
+
+# Snippet actions we own, mapped to the snippet path currently bound to them
+snippetActions = {}
+snippetRegistry = SnippetRegistry()
+
+def unregisterAction(actionText):
+    UIActionHandler.globalActions().unbindAction(actionText)
+    Menu.mainMenu("Plugins").removeAction(actionText)
+    UIAction.unregisterAction(actionText)
+
+
+def removeSnippetAction(actionText):
+    unregisterAction(actionText)
+    del snippetActions[actionText]
+
+
+def addSnippetAction(entry):
+    if not entry.hasCode:
+        return
+    actionText = actionFromSnippet(entry.path, entry.description)
+    if actionText in snippetActions:
+        removeSnippetAction(actionText)
+    snippetKeys = QKeySequence(entry.hotkey)
+    if snippetKeys.isEmpty():
+        UIAction.registerAction(actionText)
+    else:
+        UIAction.registerAction(actionText, snippetKeys)
+    UIActionHandler.globalActions().bindAction(actionText, UIAction(makeSnippetFunction(entry.path)))
+    Menu.mainMenu("Plugins").addAction(actionText, "Snippets")
+    snippetActions[actionText] = entry.path
+
+
+def dropSnippetAction(entry):
+    if not entry.hasCode:
+        return
+    actionText = actionFromSnippet(entry.path, entry.description)
+    if snippetActions.get(actionText) != entry.path:
+        return
+    removeSnippetAction(actionText)
+    # Another snippet may share the same description, let it have the action back
+    for other in snippetRegistry:
+        if other.path != entry.path and other.hasCode and actionFromSnippet(other.path, other.description) == actionText:
+            addSnippetAction(other)
+            break
+
+
+# Pipeline actions we own, mapped to their (name, stages)
+pipelineActions = {}
+
+def pipelineAction(name):
+    return "Snippets\\Pipelines\\" + name
+
+
+def makePipelineFunction(name, stages):
+    return lambda context: executePipeline(name, stages, bool(QGuiApplication.queryKeyboardModifiers() & Qt.ShiftModifier))
+
+
+def registerPipelines():
+    try:
+        pipelines = loadPipelines(pipelinePath, snippetPath)
+    except ValueError as e:
+        log_error("Snippets: %s" % e)
+        return
+    wanted = dict((pipelineAction(name), (name, stages)) for (name, stages) in pipelines.items())
+    for actionText in list(pipelineActions):
+        if wanted.get(actionText) != pipelineActions[actionText]:
+            unregisterAction(actionText)
+            del pipelineActions[actionText]
+    for (actionText, pipeline) in wanted.items():
+        if actionText not in pipelineActions:
+            UIAction.registerAction(actionText)
+            UIActionHandler.globalActions().bindAction(actionText, UIAction(makePipelineFunction(*pipeline)))
+            Menu.mainMenu("Plugins").addAction(actionText, "Snippets")
+            pipelineActions[actionText] = pipeline
+
+
+def applyRegistryDiff(diff):
+    for entry in diff.removed:
+        dropSnippetAction(entry)
+    for (old, new) in diff.changed:
+        dropSnippetAction(old)
+        addSnippetAction(new)
+    for entry in diff.added:
+        addSnippetAction(entry)
+
+
+class AnalysisFlushTask(BackgroundTaskThread):
+    """Update analysis for a view whose pending update no queued run is left to flush."""
+
+    def __init__(self, key):
+        BackgroundTaskThread.__init__(self, "Updating analysis...", False)
+        self.key = key
+
+    def run(self):
+        try:
+            analysisUpdates.flush(self.key)
+        except Exception:
+            log_error(traceback.format_exc())
+
+
+def runDiscarded(run):
+    # Runs that finished earlier skipped their update while this one was queued
+    if analysisUpdates.needsFlush(run.viewKey, snippetScheduler):
+        AnalysisFlushTask(run.viewKey).start()
+
+
+snippetScheduler = SnippetScheduler(onDiscard=runDiscarded)
+# Snippets with `# snippet: analysis=update` ask for an update here, it runs
+# once the last queued snippet for that view is done
+analysisUpdates = AnalysisUpdates()
+runHistory = RunHistory(historyPath)
 
 class SnippetTask(BackgroundTaskThread):
-    def __init__(self, code, snippetGlobals, context, snippetName="Executing snippet"):
-        BackgroundTaskThread.__init__(self, f"{snippetName}...", False)
-        self.code = code
+    def __init__(self, compiled, snippetGlobals, context, source, snippetName="Executing snippet", profile=False, forceRerun=False):
+        BackgroundTaskThread.__init__(self, f"{snippetName}...", True)
+        self.code = compiled.code
+        self.contentHash = compiled.contentHash
+        self.names = compiled.names
+        self.options = compiled.options
         self.globals = snippetGlobals
         self.context = context
+        self.source = source
+        self.snippetName = snippetName
+        self.profile = profile
+        self.scheduledRun = None
+        self.memoryPeak = None
+        self.abortNote = ""
+        self.forceRerun = forceRerun
+        self.cacheHit = False
+
+    def startScheduled(self, scheduledRun):
+        self.scheduledRun = scheduledRun
+        self.start()
+
+    def cpuTime(self):
+        return time.thread_time()
 
     def run(self):
-        if self.context.binaryView:
-            self.context.binaryView.begin_undo_actions()
-        snippetGlobals = self.globals
-        exec("from binaryninja import *", snippetGlobals)
-        exec(self.code, snippetGlobals)
-        if gUpdateAnalysisOnRun:
-            exec("bv.update_analysis_and_wait()", snippetGlobals)
+        error = None
+        outcome = "ok"
+        startedAt = time.time()
+        wallStart = time.perf_counter()
+        cpuStart = self.cpuTime()
+        try:
+            self.runSnippet()
+            if self.cacheHit:
+                outcome = "cached"
+        except SnippetAborted as e:
+            error = str(e)
+            outcome = e.outcome
+            log_warn("Snippets: %s %s%s" % (self.snippetName, e, self.abortNote))
+        except BaseException as e:
+            error = "%s: %s" % (type(e).__name__, e)
+            outcome = "error"
+            log_error(traceback.format_exc())
+        finally:
+            record = RunRecord(self.source, self.contentHash, startedAt, time.perf_counter() - wallStart,
+                               self.cpuTime() - cpuStart, self.memoryPeak, outcome, error)
+            self.updatePendingAnalysis()
+            if self.scheduledRun is not None:
+                snippetScheduler.finished(self.scheduledRun, error)
+            runHistory.append(record)
+            execute_on_main_thread(runStatsChanged)
+
+    def resultKey(self, contentHash, names, options):
+        """Key for this run's result in resultCache, None if it can't be cached."""
+        bv = self.context.binaryView
+        generation = analysisGeneration(bv)
+        if "cacheable" not in options or generation is None or self.profile:
+            return None
+        location = None
+        if usesLocation(names):
+            function = self.context.function
+            location = (function.start if function else None, self.context.address, getattr(self.context, "length", None))
+        return (contentHash, viewKey(bv), generation, location)
+
+    def cachedResult(self, key):
+        """(True, result) when key's result is cached and may be used, else (False, None)."""
+        if key is None or self.forceRerun:
+            return (False, None)
+        return resultCache.get(key)
+
+    def storeResult(self, key, value):
+        if key is not None:
+            resultCache.capacity = Settings().get_integer("snippets.resultCacheSize")
+            resultCache.put(key, value)
+
+    def requestAnalysis(self):
+        bv = self.context.binaryView
+        if bv is not None and self.options.get("analysis") == "update":
+            analysisUpdates.request(viewKey(bv), bv)
+
+    def flushAnalysis(self):
+        """flush_analysis() for snippets that need up to date analysis before they carry on."""
+        bv = self.context.binaryView
+        if bv is not None:
+            analysisUpdates.request(viewKey(bv), bv)
+            analysisUpdates.flush(viewKey(bv))
+
+    def updatePendingAnalysis(self):
+        # Still holding this view's slot in the scheduler, so nothing else can
+        # start against it while analysis catches up
+        bv = self.context.binaryView
+        if bv is None or viewKey(bv) not in analysisUpdates.pending:
+            return
+        self.progress = f"{self.snippetName} (updating analysis)..."
+        try:
+            analysisUpdates.flushIfIdle(viewKey(bv), snippetScheduler)
+        except Exception:
+            log_error(traceback.format_exc())
+
+    def budget(self, option, setting, scale, options=None):
+        value = (self.options if options is None else options).get(option)
+        try:
+            limit = float(value) if value is not None else Settings().get_integer(setting)
+        except ValueError:
+            log_warn("Snippets: ignoring invalid %s=%s in %s" % (option, value, self.snippetName))
+            limit = Settings().get_integer(setting)
+        return limit * scale if limit > 0 else None
+
+    def undoPolicy(self, options=None):
+        value = (self.options if options is None else options).get("undo")
+        try:
+            return parseUndoPolicy(value)
+        except ValueError:
+            log_warn("Snippets: ignoring invalid undo=%s in %s" % (value, self.snippetName))
+            return defaultUndoPolicy
+
+    def execProfiled(self, snippetGlobals):
+        profiler = profiledExec(self.code, snippetGlobals)
+        try:
+            path = saveProfile(profiler, profilePath, self.snippetName.split("\\")[-1])
+            report = hotSpots(profiler)
+            execute_on_main_thread(lambda: showProfile(self.snippetName, path, report))
+        except OSError as e:
+            log_error("Snippets: Unable to save profile for %s: %s" % (self.snippetName, e))
+        if profiler.error is not None:
+            raise profiler.error
+
+    def runSnippet(self):
+        key = self.resultKey(self.contentHash, self.names, self.options)
+        (self.cacheHit, value) = self.cachedResult(key)
+        if self.cacheHit:
+            log_info("Snippets: %s result (cached): %r" % (self.snippetName, value))
+            return
+        undo = SnippetUndo(self.context.binaryView, self.undoPolicy())
+        undo.begin()
+        # Only the context values the snippet refers to are computed, on top of a
+        # shared copy of `from binaryninja import *`
+        snippetGlobals = self.globals.materialize(self.names, baseNamespace())
+        snippetGlobals['flush_analysis'] = self.flushAnalysis
+        self.execStage(self.code, snippetGlobals, undo, self.options)
+        self.requestAnalysis()
+        self.navigate(snippetGlobals)
+        undo.commit()
+        if key is not None:
+            value = snippetGlobals.get('result')
+            self.storeResult(key, value)
+            log_info("Snippets: %s result: %r" % (self.snippetName, value))
+
+    def execStage(self, code, snippetGlobals, undo, options):
+        watchdog = Watchdog(lambda: self.cancelled,
+                            timeLimit=self.budget("timeout", "snippets.timeLimit", 1, options),
+                            memoryLimit=self.budget("memory", "snippets.memoryLimit", 1024 * 1024, options),
+                            trackPeak=Settings().get_bool("snippets.recordMemoryPeak"))
+        trace = undo.tracing()
+        previousTrace = sys.gettrace()
+        try:
+            if trace is not None:
+                sys.settrace(trace)
+            if self.profile:
+                watchdog.run(self.execProfiled, snippetGlobals)
+            else:
+                watchdog.run(exec, code, snippetGlobals)
+            undo.checkpoint()
+        except SnippetAborted as e:
+            self.abortNote = undo.revert()
+            raise type(e)(watchdog.fired or e)
+        except BaseException:
+            undo.commit()
+            raise
+        finally:
+            if trace is not None:
+                sys.settrace(previousTrace)
+            if watchdog.peak is not None:
+                self.memoryPeak = max(self.memoryPeak or 0, watchdog.peak)
+
+    def navigate(self, snippetGlobals):
         if "here" in snippetGlobals and hasattr(self.context, "address") and snippetGlobals['here'] != self.context.address:
             self.context.binaryView.file.navigate(self.context.binaryView.file.view, snippetGlobals['here'])
         if "current_address" in snippetGlobals and hasattr(self.context, "address") and snippetGlobals['current_address'] != self.context.address:
@@ -270,8 +801,477 @@ class SnippetTask(BackgroundTaskThread):
             if addr is not None:
                 if not self.context.binaryView.file.navigate(self.context.binaryView.file.view, addr):
                     binaryninja.mainthread.execute_on_main_thread(lambda: self.locals["current_ui_context"].navigateForBinaryView(self.active_view, addr))
-        if self.context.binaryView:
-            self.context.binaryView.commit_undo_actions()
+
+
+class SnippetFanOutTask(SnippetTask):
+    """Run a snippet once per function, or per function starting in the selection, on a thread pool.
+
+    Each run sees that function as current_function with the IL globals bound
+    to it, and whatever it leaves in `result` ends up in one report. For a
+    `cacheable` snippet the report of a run that got through every function
+    is cached, keyed on the selection rather than the cursor.
+    """
+
+    def cpuTime(self):
+        # The work happens on pool threads, so this also counts anything else running at the time
+        return time.process_time()
+
+    def runSnippet(self):
+        bv = self.context.binaryView
+        if bv is None:
+            log_warn("Snippets: %s needs an open binary to run for each function" % self.snippetName)
+            return
+        selection = self.globals.get('current_selection')
+        if selection and selection[1] > selection[0]:
+            selection = (selection[0], selection[1])
+            functions = [f for f in bv.functions if selection[0] <= f.start < selection[1]]
+        else:
+            selection = None
+            functions = list(bv.functions)
+        key = self.resultKey((self.contentHash, selection), frozenset(), self.options)
+        (self.cacheHit, report) = self.cachedResult(key)
+        if self.cacheHit:
+            show_markdown_report(self.snippetName, report)
+            return
+
+        undo = SnippetUndo(bv, self.undoPolicy())
+        undo.begin()
+        # Location specific values make no sense here, only take the view-wide ones
+        base = self.globals.materialize(frozenset(), baseNamespace())
+        base['flush_analysis'] = self.flushAnalysis
+        # Budgets stop new functions from starting, the ones already running finish
+        watchdog = Watchdog(lambda: self.cancelled,
+                            timeLimit=self.budget("timeout", "snippets.timeLimit", 1),
+                            memoryLimit=self.budget("memory", "snippets.memoryLimit", 1024 * 1024),
+                            trackPeak=Settings().get_bool("snippets.recordMemoryPeak"),
+                            interrupt=False)
+        def shouldStop():
+            return watchdog.fired is not None
+        started = [0]
+        def makeGlobals(function):
+            undo.checkpoint()
+            started[0] += 1
+            self.progress = "%s (%d/%d functions)..." % (self.snippetName, started[0], len(functions))
+            return functionGlobals(base, function, self.names)
+        try:
+            with watchdog:
+                results = runForEach(self.code, functions, makeGlobals, os.cpu_count() or 4, shouldStop)
+        finally:
+            undo.commit()
+            self.memoryPeak = watchdog.peak
+        self.requestAnalysis()
+        if len(results) < len(functions):
+            log_warn("Snippets: %s %s, stopped after %d of %d functions" % (self.snippetName, watchdog.fired, len(results), len(functions)))
+
+        report = formatReport(self.snippetName, results, lambda f: "%s @ %#x" % (f.name, f.start))
+        if len(results) == len(functions):
+            self.storeResult(key, report)
+        show_markdown_report(self.snippetName, report)
+
+
+class DataEdits(BinaryDataNotification):
+    """Counts writes, inserts and removals of data in a view.
+
+    Unlike AnalysisGeneration this leaves out what auto-analysis changes on
+    its own, so the count follows the edits a snippet makes. Only counts:
+    notifications arrive on whichever thread the core delivers them on, so
+    nothing here calls back into the core.
+    """
+
+    def __init__(self):
+        BinaryDataNotification.__init__(self)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def edited(self, *args):
+        with self.lock:
+            self.count += 1
+
+    data_written = data_inserted = data_removed = edited
+
+    def take(self, atLeast):
+        """Reset and return the count if it reached atLeast, else 0."""
+        with self.lock:
+            if self.count < atLeast:
+                return 0
+            (count, self.count) = (self.count, 0)
+            return count
+
+
+class SnippetUndo:
+    """Undo bookkeeping for one run, following the snippet's `undo=` directive.
+
+    none skips undo entirely, single (the default) makes the whole run one
+    undo group, and chunked:N starts a new group once the open one holds N
+    data edits. The group is only switched on the snippet's own thread in
+    checkpoint(): at each Python call while a stage runs under tracing(),
+    between fan-out functions and between pipeline stages.
+    """
+
+    def __init__(self, bv, policy):
+        self.bv = bv
+        self.policy = policy
+        self.enabled = bv is not None and policy.mode != "none"
+        self.state = None
+        self.edits = None
+        self.lock = threading.Lock()
+
+    def begin(self):
+        if not self.enabled:
+            return
+        self.state = self.bv.begin_undo_actions()
+        if self.policy.mode == "chunked":
+            self.edits = DataEdits()
+            self.bv.register_notification(self.edits)
+
+    def checkpoint(self):
+        edits = self.edits
+        if edits is None or edits.count < self.policy.chunkSize:
+            return
+        # Fan-out runs get here from several threads
+        with self.lock:
+            if self.edits is None or not edits.take(self.policy.chunkSize):
+                return
+            commitUndoActions(self.bv, self.state)
+            self.state = self.bv.begin_undo_actions()
+
+    def trace(self, frame, event, arg):
+        # Global trace function, only sees calls and asks for no line events
+        self.checkpoint()
+        return None
+
+    def tracing(self):
+        """Trace function for sys.settrace on the thread running a stage, None if not chunking."""
+        return self.trace if self.edits is not None else None
+
+    def stopCounting(self):
+        with self.lock:
+            edits = self.edits
+            self.edits = None
+        if edits is not None:
+            self.bv.unregister_notification(edits)
+        return edits.count if edits is not None else 0
+
+    def commit(self):
+        if self.enabled:
+            self.stopCounting()
+            commitUndoActions(self.bv, self.state)
+
+    def revert(self):
+        """Revert the open undo group, returning a note on what that covered for the log."""
+        if self.bv is None:
+            return ""
+        if not self.enabled:
+            return ", it runs with undo=none so its changes were kept"
+        pending = self.stopCounting()
+        revertUndoActions(self.bv, self.state)
+        if self.policy.mode == "chunked":
+            return ", the undo group it had open (%d data edits) was undone, earlier groups were kept" % pending
+        return ", its changes were undone"
+
+
+class SnippetPipelineTask(SnippetTask):
+    """Run the stages of a pipeline one after another with one context setup and one undo group.
+
+    Each stage starts from the same context globals, plus `pipeline_input`
+    holding whatever the previous stage left in `result`.
+    """
+
+    def __init__(self, stages, snippetGlobals, context, source, snippetName, forceRerun=False):
+        # stages is a list of (path, CompiledSnippet)
+        names = frozenset()
+        for (_, compiled) in stages:
+            names = None if names is None or compiled.names is None else names | compiled.names
+        contentHash = hashlib.sha1("".join(compiled.contentHash for (_, compiled) in stages).encode("utf-8")).hexdigest()
+        options = {"analysis": "update"} if any(compiled.options.get("analysis") == "update" for (_, compiled) in stages) else {}
+        pipeline = CompiledSnippet(None, contentHash, snippetName, names, options)
+        SnippetTask.__init__(self, pipeline, snippetGlobals, context, source, snippetName=snippetName, forceRerun=forceRerun)
+        self.stages = stages
+
+    def undoPolicy(self, options=None):
+        policies = [SnippetTask.undoPolicy(self, compiled.options) for (_, compiled) in self.stages]
+        chunkSizes = [policy.chunkSize for policy in policies if policy.mode == "chunked"]
+        if chunkSizes:
+            return UndoPolicy("chunked", min(chunkSizes))
+        if all(policy.mode == "none" for policy in policies):
+            return UndoPolicy("none", 0)
+        return defaultUndoPolicy
+
+    def runSnippet(self):
+        undo = SnippetUndo(self.context.binaryView, self.undoPolicy())
+        undo.begin()
+        base = self.globals.materialize(self.names, baseNamespace())
+        base['flush_analysis'] = self.flushAnalysis
+        snippetGlobals = base
+        value = None
+        # What the current pipeline_input can be identified by in a cache key
+        inputKey = None
+        for (index, (path, compiled)) in enumerate(self.stages):
+            self.progress = "%s (%d/%d: %s)..." % (self.snippetName, index + 1, len(self.stages), os.path.basename(path))
+            # A cacheable stage that already ran on the same input can hand its result straight on
+            key = None
+            if inputKey is not unknownInput:
+                key = self.resultKey((compiled.contentHash, inputKey), compiled.names, compiled.options)
+            (hit, cached) = self.cachedResult(key)
+            if hit:
+                value = cached
+            else:
+                snippetGlobals = dict(base)
+                snippetGlobals['pipeline_input'] = value
+                self.execStage(compiled.code, snippetGlobals, undo, compiled.options)
+                value = snippetGlobals.get('result')
+                self.storeResult(key, value)
+            inputKey = key if key is not None else stageInputKey(value)
+        self.requestAnalysis()
+        self.navigate(snippetGlobals)
+        undo.commit()
+        if value is not None:
+            log_info("Snippets: %s result: %r" % (self.snippetName, value))
+
+
+unknownInput = object()
+
+def stageInputKey(value):
+    # A stage result that wasn't cached can only be keyed on if it is hashable
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return unknownInput
+
+
+def commitUndoActions(bv, undoState):
+    # Newer APIs hand back an id from begin_undo_actions, older ones don't
+    if undoState is not None:
+        bv.commit_undo_actions(undoState)
+    else:
+        bv.commit_undo_actions()
+
+
+def revertUndoActions(bv, undoState):
+    if undoState is not None and hasattr(bv, "revert_undo_actions"):
+        bv.revert_undo_actions(undoState)
+    else:
+        bv.commit_undo_actions()
+        bv.undo()
+
+
+class SnippetProfileDialog(QDialog):
+    """Hot spots from a profiled snippet run."""
+
+    def __init__(self, snippetName, path, report, parent=None):
+        super(SnippetProfileDialog, self).__init__(parent)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.setWindowTitle(self.tr("Profile: ") + snippetName)
+        self.path = path
+        text = QPlainTextEdit()
+        text.setReadOnly(True)
+        text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        text.setFont(getMonospaceFont(self))
+        text.setPlainText(report)
+        openButton = QPushButton(self.tr("Open Profiles Folder"))
+        openButton.clicked.connect(lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(os.path.dirname(self.path))))
+        buttons = QHBoxLayout()
+        buttons.addWidget(QLabel(path))
+        buttons.addStretch()
+        buttons.addWidget(openButton)
+        layout = QVBoxLayout()
+        layout.addWidget(text)
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+        self.resize(900, 500)
+
+
+profileDialogs = []
+
+def showProfile(snippetName, path, report):
+    dialog = SnippetProfileDialog(snippetName, path, report)
+    # Keep a reference so Shiboken doesn't free it while it is visible
+    profileDialogs.append(dialog)
+    dialog.finished.connect(lambda _: profileDialogs.remove(dialog))
+    dialog.show()
+
+
+class SnippetQueueDialog(QDialog):
+    """Queued, running and recently finished snippet runs."""
+
+    def __init__(self, parent=None):
+        super(SnippetQueueDialog, self).__init__(parent)
+        self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
+        self.setWindowTitle(self.tr("Snippet Runs"))
+        self.runs = QTreeWidget()
+        self.runs.setHeaderLabels([self.tr("Snippet"), self.tr("State"), self.tr("Queued"), self.tr("Duration"), self.tr("Error")])
+        self.runs.setRootIsDecorated(False)
+        layout = QVBoxLayout()
+        layout.addWidget(self.runs)
+        self.setLayout(layout)
+        self.resize(700, 300)
+        self.refreshTimer = QTimer(self)
+        self.refreshTimer.setInterval(500)
+        self.refreshTimer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refreshTimer.start()
+        super(SnippetQueueDialog, self).showEvent(event)
+
+    def hideEvent(self, event):
+        self.refreshTimer.stop()
+        super(SnippetQueueDialog, self).hideEvent(event)
+
+    def refresh(self):
+        self.runs.clear()
+        for run in snippetScheduler.runs():
+            duration = "" if run.duration is None else "%.2fs" % run.duration
+            queued = datetime.fromtimestamp(run.queuedAt).strftime("%H:%M:%S")
+            self.runs.addTopLevelItem(QTreeWidgetItem([run.name, run.state, queued, duration, run.error or ""]))
+        for x in range(self.runs.columnCount()):
+            self.runs.resizeColumnToContents(x)
+
+
+class SnippetDiscoverySignals(QObject):
+    # Emitted on the main thread once discovery is done, with the number of entries touched
+    finished = Signal(int)
+
+discoverySignals = SnippetDiscoverySignals()
+
+# The one discovery task allowed at a time, and whether another pass was
+# asked for while it ran
+discoveryLock = threading.Lock()
+discoveryTask = None
+discoveryQueued = False
+
+
+class SnippetDiscoveryTask(BackgroundTaskThread):
+    """Walk the snippet folder and read headers off the main thread.
+
+    Action registration has to happen on the main thread, so changes are
+    handed over in small batches to keep the UI responsive while the menu fills in.
+    Started through startDiscovery, so passes never overlap and their batches
+    are applied in order.
+    """
+    batchSize = 50
+
+    def __init__(self):
+        BackgroundTaskThread.__init__(self, "Loading snippets...", False)
+
+    def run(self):
+        global discoveryTask, discoveryQueued
+        touched = 0
+        while True:
+            try:
+                touched += self.discover()
+            except Exception as e:
+                log_error("Snippets: discovery failed: %s" % e)
+            with discoveryLock:
+                if not discoveryQueued:
+                    discoveryTask = None
+                    break
+                discoveryQueued = False
+        execute_on_main_thread(lambda: discoverySignals.finished.emit(touched))
+
+    def discover(self):
+        def progress(count):
+            self.progress = "Loading snippets (%d checked)..." % count
+        diff = snippetRegistry.refresh(snippetFiles(), progress)
+        done = 0
+        for batch in diff.batches(self.batchSize):
+            execute_on_main_thread_and_wait(lambda: applyRegistryDiff(batch))
+            done += batch.touched
+            self.progress = "Registering snippets (%d/%d)..." % (done, diff.touched)
+        execute_on_main_thread_and_wait(registerPipelines)
+        if diff:
+            log_debug("Snippets: %d added, %d removed, %d changed" % (len(diff.added), len(diff.removed), len(diff.changed)))
+        if diff or diff.refreshed:
+            saveManifest(manifestPath, snippetPath, snippetRegistry)
+        return diff.touched
+
+
+def startDiscovery():
+    """Bring the registry and snippet actions up to date with the snippet folder, on a worker.
+
+    If a pass is already running it goes around once more when done instead,
+    so a pass never applies changes older than another's.
+    """
+    global discoveryTask, discoveryQueued
+    with discoveryLock:
+        if discoveryTask is not None:
+            discoveryQueued = True
+            return
+        discoveryTask = SnippetDiscoveryTask()
+        task = discoveryTask
+    task.start()
+
+
+def loadSnippets():
+    entries = loadManifest(manifestPath, snippetPath)
+    if entries is not None:
+        # Fill the menu straight away, discovery will catch anything that changed since
+        applyRegistryDiff(snippetRegistry.seed(entries))
+    registerPipelines()
+    startDiscovery()
+
+
+def formatDuration(seconds):
+    if seconds < 1:
+        return "%.0f ms" % (seconds * 1000)
+    return "%.2f s" % seconds
+
+
+class SnippetFileModel(QFileSystemModel):
+    """The snippet folder plus p50/p95 run time columns from the run history."""
+    fileColumns = 4
+    statColumns = ["p50", "p95"]
+
+    def columnCount(self, parent=QModelIndex()):
+        count = super(SnippetFileModel, self).columnCount(parent)
+        return count + len(self.statColumns) if count else 0
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if section >= self.fileColumns and orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.statColumns[section - self.fileColumns]
+        return super(SnippetFileModel, self).headerData(section, orientation, role)
+
+    def runStats(self, index):
+        return runHistory.stats().get(self.filePath(index))
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.column() < self.fileColumns:
+            return super(SnippetFileModel, self).data(index, role)
+        stats = self.runStats(index)
+        if stats is None:
+            return None
+        value = stats.p50 if index.column() == self.fileColumns else stats.p95
+        if role == Qt.DisplayRole:
+            return formatDuration(value)
+        if role == Qt.UserRole:
+            return value
+        if role == Qt.ToolTipRole:
+            return "%d runs, %d failed" % (stats.count, stats.failures)
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+
+class SnippetSortModel(QSortFilterProxyModel):
+    """Folders first, then by the chosen column, numerically where that makes sense."""
+
+    def lessThan(self, left, right):
+        files = self.sourceModel()
+        leftDir = files.isDir(left)
+        if leftDir != files.isDir(right):
+            return leftDir
+        column = left.column()
+        if column == 1:
+            return files.size(left) < files.size(right)
+        if column == 3:
+            return files.lastModified(left) < files.lastModified(right)
+        if column >= files.fileColumns:
+            # Snippets that never ran sort before the fastest ones
+            leftValue = files.data(left, Qt.UserRole)
+            rightValue = files.data(right, Qt.UserRole)
+            return (-1 if leftValue is None else leftValue) < (-1 if rightValue is None else rightValue)
+        return files.data(left).lower() < files.data(right).lower()
 
 
 class Snippets(QDialog):
@@ -290,7 +1290,8 @@ class Snippets(QDialog):
         self.editButton = QPushButton(self.tr("Open in Editor"))
         self.updateAnalysis = QCheckBox(self.tr("Update analysis when run"))
         self.clearHotkeyButton = QPushButton(self.tr("Clear Hotkey"))
-        self.updateAnalysis.stateChanged.connect(self.setGlobalUpdateFlag)
+        self.updateAnalysis.setToolTip(self.tr("Adds '# snippet: analysis=update' to this snippet. Analysis is updated once the last snippet queued for the view is done."))
+        self.updateAnalysis.stateChanged.connect(self.setUpdateAnalysisDirective)
         self.setWindowTitle(self.title.text())
         #self.newFolderButton = QPushButton("New Folder")
         self.browseButton = QPushButton("Browse Snippets")
@@ -299,8 +1300,14 @@ class Snippets(QDialog):
         self.newSnippetButton = QPushButton("New Snippet")
         self.watcher = QFileSystemWatcher()
         self.watcher.addPath(snippetPath)
+        if os.path.exists(pipelinePath):
+            self.watcher.addPath(pipelinePath)
         self.watcher.directoryChanged.connect(self.snippetDirectoryChanged)
         self.watcher.fileChanged.connect(self.snippetDirectoryChanged)
+        self.changedPaths = set()
+        self.reloadTimer = QTimer(self)
+        self.reloadTimer.setSingleShot(True)
+        self.reloadTimer.timeout.connect(self.flushSnippetChanges)
         indentation = Settings().get_string("snippets.indentation")
         if Settings().get_bool("snippets.syntaxHighlight"):
             self.edit = QCodeEditor(SyntaxHighlighter=Pylighter, delimeter = indentation)
@@ -308,7 +1315,7 @@ class Snippets(QDialog):
             self.edit = QCodeEditor(SyntaxHighlighter=None, delimeter = indentation)
         self.edit.setPlaceholderText("python code")
         self.resetting = False
-        self.columns = 3
+        self.columns = 5
         self.context = context
 
         self.keySequenceEdit = QKeySequenceEdit(self)
@@ -332,13 +1339,15 @@ class Snippets(QDialog):
         self.edit.minimumHeight = font.height() * 20
 
         #Files
-        self.files = QFileSystemModel()
+        self.files = SnippetFileModel()
         self.files.setRootPath(snippetPath)
         self.files.setReadOnly(False)
+        self.sortedFiles = SnippetSortModel()
+        self.sortedFiles.setSourceModel(self.files)
 
         #Tree
         self.tree = QTreeView()
-        self.tree.setModel(self.files)
+        self.tree.setModel(self.sortedFiles)
         self.tree.setDragDropMode(QAbstractItemView.InternalMove)
         self.tree.setDragEnabled(True)
         self.tree.setDefaultDropAction(Qt.MoveAction)
@@ -347,8 +1356,8 @@ class Snippets(QDialog):
         self.tree.customContextMenuRequested.connect(self.contextMenu)
         self.tree.hideColumn(2)
         self.tree.sortByColumn(0, Qt.AscendingOrder)
-        self.tree.setRootIndex(self.files.index(snippetPath))
-        for x in range(self.columns):
+        self.tree.setRootIndex(self.indexForPath(snippetPath))
+        for x in range(self.files.columnCount()):
             #self.tree.resizeColumnToContents(x)
             self.tree.header().setSectionResizeMode(x, QHeaderView.ResizeToContents)
         treeLayout = QVBoxLayout()
@@ -416,6 +1425,7 @@ class Snippets(QDialog):
 
         # Add signals
         self.saveButton.clicked.connect(self.save)
+        self.edit.textChanged.connect(self.syncUpdateAnalysis)
         self.editButton.clicked.connect(self.editor)
         self.runButton.clicked.connect(self.run)
         self.exportButton.clicked.connect(self.export)
@@ -427,7 +1437,7 @@ class Snippets(QDialog):
 
         if self.settings.contains("ui/snippeteditor/selected"):
             selectedName = self.settings.value("ui/snippeteditor/selected")
-            self.tree.selectionModel().select(self.files.index(selectedName), QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
+            self.tree.selectionModel().select(self.indexForPath(selectedName), QItemSelectionModel.ClearAndSelect | QItemSelectionModel.Rows)
             if self.tree.selectionModel().hasSelection():
                 self.selectFile(self.tree.selectionModel().selection(), None)
                 self.edit.setFocus()
@@ -439,31 +1449,44 @@ class Snippets(QDialog):
         else:
             self.readOnly(True)
 
-    def setGlobalUpdateFlag(self):
-        """Update the "update analysis after run?" global variable."""
-        global gUpdateAnalysisOnRun
-        gUpdateAnalysisOnRun = self.updateAnalysis.isChecked()
+    def indexForPath(self, path):
+        return self.sortedFiles.mapFromSource(self.files.index(path))
+
+    def pathForIndex(self, index):
+        return self.files.filePath(self.sortedFiles.mapToSource(index))
+
+    def runStatsChanged(self):
+        if self.tree.header().sortIndicatorSection() >= self.files.fileColumns:
+            self.sortedFiles.invalidate()
+        else:
+            self.tree.viewport().update()
+
+    def setUpdateAnalysisDirective(self):
+        """Add or remove the snippet's `analysis=update` directive to match the checkbox."""
+        if self.edit.isReadOnly():
+            return
+        code = self.edit.toPlainText()
+        newCode = setDirective(code, "analysis", "update" if self.updateAnalysis.isChecked() else None)
+        if newCode == code:
+            return
+        # Edit through a cursor so the change is a single undo step in the editor
+        position = self.edit.textCursor().position()
+        cursor = QTextCursor(self.edit.document())
+        cursor.select(QTextCursor.Document)
+        cursor.insertText(newCode)
+        cursor.setPosition(max(0, min(len(newCode), position + len(newCode) - len(code))))
+        self.edit.setTextCursor(cursor)
+
+    def syncUpdateAnalysis(self):
+        checked = parseDirectives(self.edit.toPlainText()).get("analysis") == "update"
+        if checked != self.updateAnalysis.isChecked():
+            self.updateAnalysis.blockSignals(True)
+            self.updateAnalysis.setChecked(checked)
+            self.updateAnalysis.blockSignals(False)
 
     @staticmethod
     def registerAllSnippets():
-        for action in list(filter(lambda x: x.startswith("Snippets\\"), UIAction.getAllRegisteredActions())):
-            if action in ["Snippets\\Snippet Editor...", "Snippets\\Reload All Snippets"]:
-                continue
-            UIActionHandler.globalActions().unbindAction(action)
-            Menu.mainMenu("Plugins").removeAction(action)
-            UIAction.unregisterAction(action)
-
-        for snippet in includeWalk(snippetPath, ".py"):
-            snippetKeys = None
-            (snippetDescription, snippetKeys, snippetCode) = loadSnippetFromFile(snippet)
-            actionText = actionFromSnippet(snippet, snippetDescription)
-            if snippetCode:
-                if snippetKeys == None:
-                    UIAction.registerAction(actionText)
-                else:
-                    UIAction.registerAction(actionText, snippetKeys)
-                UIActionHandler.globalActions().bindAction(actionText, UIAction(makeSnippetFunction(snippet)))
-                Menu.mainMenu("Plugins").addAction(actionText, "Snippets")
+        startDiscovery()
 
     def clearSelection(self):
         self.keySequenceEdit.clear()
@@ -499,7 +1522,7 @@ class Snippets(QDialog):
         (folderName, ok) = QInputDialog.getText(self, self.tr("Folder Name"), self.tr("Folder Name: "))
         if ok and folderName:
             index = self.tree.selectionModel().currentIndex()
-            selection = self.files.filePath(index)
+            selection = self.pathForIndex(index)
             if QFileInfo(selection).isDir():
                 QDir(selection).mkdir(folderName)
             else:
@@ -507,7 +1530,7 @@ class Snippets(QDialog):
 
     def copyPath(self):
         index = self.tree.selectionModel().currentIndex()
-        selection = self.files.filePath(index)
+        selection = self.pathForIndex(index)
         clip = QGuiApplication.clipboard()
         clip.setText(selection)
 
@@ -519,7 +1542,7 @@ class Snippets(QDialog):
             self.clearSelection()
             self.readOnly(True)
             return
-        newSelection = self.files.filePath(new.indexes()[0])
+        newSelection = self.pathForIndex(new.indexes()[0])
         self.settings.setValue("ui/snippeteditor/selected", newSelection)
         if QFileInfo(newSelection).isDir():
             self.clearSelection()
@@ -527,7 +1550,7 @@ class Snippets(QDialog):
             return
 
         if old and old.length() > 0:
-            oldSelection = self.files.filePath(old.indexes()[0])
+            oldSelection = self.pathForIndex(old.indexes()[0])
             if not QFileInfo(oldSelection).isDir() and self.snippetChanged():
                 save = self.askSave()
                 if save == QMessageBox.Yes:
@@ -551,6 +1574,8 @@ class Snippets(QDialog):
         self.snippetDescription.setText(snippetDescription) if snippetDescription else self.snippetDescription.setText("")
         self.keySequenceEdit.setKeySequence(snippetKeys) if snippetKeys else self.keySequenceEdit.setKeySequence(QKeySequence(""))
         delimeter = "   " if snippetCode.count("    ") > snippetCode.count("\t") else "\t"
+        if self.edit.highlighter is not None:
+            self.edit.highlighter.backgroundThreshold = Settings().get_integer("snippets.backgroundHighlightThreshold")
         self.edit.setPlainText(snippetCode) if snippetCode else self.edit.setPlainText("")
         self.edit.setDelimeter(delimeter)
         self.readOnly(False)
@@ -561,14 +1586,14 @@ class Snippets(QDialog):
             if not snippetName.endswith(".py"):
                 snippetName += ".py"
             index = self.tree.selectionModel().currentIndex()
-            selection = self.files.filePath(index)
+            selection = self.pathForIndex(index)
             if QFileInfo(selection).isDir():
                 path = os.path.join(selection, snippetName)
             else:
                 path = os.path.join(snippetPath, snippetName)
                 self.readOnly(False)
             open(path, "w").close()
-            self.tree.setCurrentIndex(self.files.index(path))
+            self.tree.setCurrentIndex(self.indexForPath(path))
             log_debug("Snippets: Snippet %s created." % snippetName)
 
     def readOnly(self, flag):
@@ -576,6 +1601,7 @@ class Snippets(QDialog):
         self.snippetDescription.setReadOnly(flag)
         self.snippetName.setReadOnly(flag)
         self.edit.setReadOnly(flag)
+        self.updateAnalysis.setEnabled(not flag)
         if flag:
             self.snippetDescription.setDisabled(True)
             self.snippetName.setDisabled(True)
@@ -586,7 +1612,7 @@ class Snippets(QDialog):
             self.edit.setEnabled(True)
 
     def deleteSnippet(self):
-        selection = self.tree.selectedIndexes()[::self.columns][0] #treeview returns each selected element in the row
+        selection = self.sortedFiles.mapToSource(self.tree.selectedIndexes()[::self.columns][0]) #treeview returns each selected element in the row
         snippetName = self.files.fileName(selection)
         if self.files.isDir(selection):
             questionText = self.tr("Confirm deletion of folder AND ALL CONTENTS: ")
@@ -604,7 +1630,7 @@ class Snippets(QDialog):
             self.registerAllSnippets()
 
     def duplicateSnippet(self):
-        selection = self.tree.selectedIndexes()[::self.columns][0] #treeview returns each selected element in the row
+        selection = self.sortedFiles.mapToSource(self.tree.selectedIndexes()[::self.columns][0]) #treeview returns each selected element in the row
         snippetName = self.files.fileName(selection)
         (newname, ok) = QInputDialog.getText(self, self.tr("New Snippet Name"), self.tr("New Snippet Name:"))
         if ok and snippetName:
@@ -612,7 +1638,7 @@ class Snippets(QDialog):
             if not snippetName.endswith(".py"):
                 snippetName += ".py"
             index = self.tree.selectionModel().currentIndex()
-            selection = self.files.filePath(index)
+            selection = self.pathForIndex(index)
             if QFileInfo(selection).isDir():
                 path = os.path.join(selection, snippetName)
             else:
@@ -624,13 +1650,21 @@ class Snippets(QDialog):
             self.keySequenceEdit.setKeySequence(snippetKeys) if snippetKeys else self.keySequenceEdit.setKeySequence(QKeySequence(""))
             self.edit.setPlainText(snippetCode) if snippetCode else self.edit.setPlainText("")
             self.save()
-            self.tree.setCurrentIndex(self.files.index(path))
+            self.tree.setCurrentIndex(self.indexForPath(path))
             self.registerAllSnippets()
 
-    def snippetDirectoryChanged(self):
+    def snippetDirectoryChanged(self, path):
+        # Watcher events come in bursts, wait for things to settle before reloading
+        self.changedPaths.add(path)
+        self.reloadTimer.start(Settings().get_integer("snippets.reloadDelay"))
+
+    def flushSnippetChanges(self):
+        changedPaths = self.changedPaths
+        self.changedPaths = set()
         # reload UI and reload snippets
         self.registerAllSnippets()
-        self.loadSnippet()
+        if self.currentFile and (self.currentFile in changedPaths or os.path.dirname(self.currentFile) in changedPaths):
+            self.loadSnippet()
 
     def snippetChanged(self):
         if (self.currentFile == "" or QFileInfo(self.currentFile).isDir()):
@@ -850,9 +1884,29 @@ This plugin is released under an [MIT license](./LICENSE).
 
 snippets = None
 
+def runStatsChanged():
+    if snippets is not None:
+        try:
+            snippets.runStatsChanged()
+        except RuntimeError:
+            # The editor was closed and Qt already deleted it
+            pass
+
 def reloadActions(_):
     Snippets.registerAllSnippets()
 
+queueDialog = None
+
+def showRunQueue(context):
+    global queueDialog
+    if queueDialog is None:
+        queueDialog = SnippetQueueDialog(parent=context.widget)
+    queueDialog.show()
+    queueDialog.raise_()
+
+def logContextTimings(_):
+    log_info("Snippets: context resolution timings\n" + contextTimingReport())
+
 def launchPlugin(context):
     global snippets
     # Terrible hack to fix Shiboken freeing the object when snippets
@@ -867,13 +1921,27 @@ def launchPlugin(context):
         snippets = Snippets(context, parent=context.widget)
     snippets.show()
 
-Snippets.registerAllSnippets()
+loadSnippets()
 UIAction.registerAction("Snippets\\Snippet Editor...")
 UIAction.registerAction("Snippets\\Rerun Last Snippet")
+UIAction.registerAction("Snippets\\Rerun Last Snippet With Profiler")
+UIAction.registerAction("Snippets\\Rerun Last Snippet Without Cache")
 UIAction.registerAction("Snippets\\Reload All Snippets")
+UIAction.registerAction("Snippets\\Log Context Timings")
+UIAction.registerAction("Snippets\\Show Run Queue")
+UIAction.registerAction("Snippets\\Run Last Snippet For Each Function")
 UIActionHandler.globalActions().bindAction("Snippets\\Snippet Editor...", UIAction(launchPlugin))
 UIActionHandler.globalActions().bindAction("Snippets\\Rerun Last Snippet", UIAction(rerunLastSnippet))
+UIActionHandler.globalActions().bindAction("Snippets\\Rerun Last Snippet With Profiler", UIAction(rerunLastSnippetWithProfiler))
+UIActionHandler.globalActions().bindAction("Snippets\\Rerun Last Snippet Without Cache", UIAction(rerunLastSnippetWithoutCache))
 UIActionHandler.globalActions().bindAction("Snippets\\Reload All Snippets", UIAction(reloadActions))
+UIActionHandler.globalActions().bindAction("Snippets\\Log Context Timings", UIAction(logContextTimings))
+UIActionHandler.globalActions().bindAction("Snippets\\Show Run Queue", UIAction(showRunQueue))
+UIActionHandler.globalActions().bindAction("Snippets\\Run Last Snippet For Each Function", UIAction(runLastSnippetForEachFunction))
 Menu.mainMenu("Plugins").addAction("Snippets\\Snippet Editor...", "Snippet")
 Menu.mainMenu("Plugins").addAction("Snippets\\Rerun Last Snippet", "Snippet")
+Menu.mainMenu("Plugins").addAction("Snippets\\Rerun Last Snippet With Profiler", "Snippet")
+Menu.mainMenu("Plugins").addAction("Snippets\\Rerun Last Snippet Without Cache", "Snippet")
+Menu.mainMenu("Plugins").addAction("Snippets\\Run Last Snippet For Each Function", "Snippet")
 Menu.mainMenu("Plugins").addAction("Snippets\\Reload All Snippets", "Snippet")
+Menu.mainMenu("Plugins").addAction("Snippets\\Show Run Queue", "Snippet")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Tab completion latency in the snippet editor: rlcompleter (which
+# bncompleter, the editor's old completer, is based on) against the
+# prefix-indexed SnippetCompleter, for the first Tab on a line and for
+# cycling through every candidate.
+#
+# Run it with Binary Ninja's python on the path, or point --module at any
+# other large module; --extra pads the namespace with more names.
+#
+#   python3 benchmarks/bench_completion.py [--module binaryninja] [--extra 0] [--repeat 20]
+
+import os
+import sys
+import time
+import argparse
+import rlcompleter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from snippetlib.context import baseNamespace
+from snippetlib.completion import SnippetCompleter, expressionPattern
+
+frame = 1 / 60
+
+
+def sampleLines(namespace):
+    """A few lines ending in a global prefix and a few ending in an attribute prefix."""
+    names = sorted(name for name in namespace if not name.startswith("_"))
+    lines = ["    x = " + name[:2] for name in names[::max(1, len(names) // 5)]]
+    classes = sorted((len(dir(value)), name) for (name, value) in namespace.items() if isinstance(value, type))
+    for (_, name) in classes[-3:]:
+        lines.append("    y = %s." % name)
+        lines.append("    y = %s.g" % name)
+    return lines
+
+
+def cycle(complete, text):
+    """Tab through every candidate, returns (first Tab seconds, all Tabs seconds, candidates)."""
+    start = time.perf_counter()
+    complete(text, 0)
+    first = time.perf_counter() - start
+    state = 1
+    while complete(text, state) is not None:
+        state += 1
+    return (first, time.perf_counter() - start, state)
+
+
+def measure(label, makeComplete, lines, repeat):
+    worstFirst = worstCycle = 0.0
+    total = 0
+    for line in lines:
+        best = None
+        for _ in range(repeat):
+            result = cycle(makeComplete(), line)
+            best = result if best is None else min(best, result)
+        worstFirst = max(worstFirst, best[0])
+        worstCycle = max(worstCycle, best[1])
+        total += best[2]
+    print("%-18s worst first Tab %8.3f ms (%s a frame)  worst full cycle %9.3f ms  %6d candidates" % (
+        label, worstFirst * 1000, "within" if worstFirst < frame else "over", worstCycle * 1000, total))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="binaryninja")
+    parser.add_argument("--extra", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    namespace = dict(baseNamespace(args.module))
+    for i in range(args.extra):
+        namespace["extra_name_%d" % i] = i
+    lines = sampleLines(namespace)
+    print("%d names in the namespace, %d lines" % (len(namespace), len(lines)))
+
+    # rlcompleter only sees the dotted name, the editor hands over the whole line
+    old = rlcompleter.Completer(namespace)
+    measure("rlcompleter", lambda: lambda line, state: old.complete(expressionPattern.search(line).group(), state), lines, args.repeat)
+    # A warm completer, as in the editor after the first Tab, fresh candidates per line
+    new = SnippetCompleter(lambda: namespace)
+    def warm():
+        new.line = None
+        return new.complete
+    measure("SnippetCompleter", warm, lines, args.repeat)
+    # Building the index is paid once per namespace, on the first Tab
+    start = time.perf_counter()
+    SnippetCompleter(lambda: namespace).complete(lines[0], 0)
+    print("%-18s %8.3f ms" % ("first Tab ever", (time.perf_counter() - start) * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Syntax highlighting cost on a large snippet: the old per-character format
+# list against run-length format spans, and the old whole-document
+# Pylighter against lexing block by block. Qt isn't needed, formats are
+# stand-in objects and setFormat calls are only counted.
+#
+#   python3 benchmarks/bench_highlight.py [--lines 3000] [--repeat 5]
+
+import os
+import re
+import sys
+import time
+import argparse
+import tracemalloc
+
+from pygments import highlight
+from pygments.formatter import Formatter
+from pygments.lexers import get_lexer_by_name
+
+root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, root)
+from pygments.token import Text, Whitespace
+from snippetlib.lexing import LineLexer, TokenFormats, formatSpans
+
+# The token names QCodeEditor styles, each with its own stand-in format
+with open(os.path.join(root, "QCodeEditor.py"), encoding="utf-8") as editorSource:
+    styles = dict((name, object()) for name in re.findall(r"'(Token[\w.]*)'\s*:", editorSource.read()))
+
+
+class CharacterFormatter(Formatter):
+    """The old QFormatter: one list entry per character, str(token) lookups per token."""
+
+    def __init__(self):
+        Formatter.__init__(self)
+        self.pygstyles = {}
+        for token, style in self.style:
+            self.pygstyles[str(token)] = styles.get(str(token), styles['Token.Name'])
+
+    def format(self, tokensource, outfile):
+        self.data = []
+        for token, value in tokensource:
+            self.data.extend([self.pygstyles[str(token)], ] * len(value))
+
+
+def formatTokens(tokensource, formats):
+    """Format spans for a pygments (tokentype, value) stream, as handed to a Formatter."""
+    spans = []
+    position = runStart = 0
+    runFormat = None
+    for (token, value) in tokensource:
+        format = formats[token]
+        if format is not None and format is not runFormat:
+            if runFormat is not None:
+                spans.append((runStart, position - runStart, runFormat))
+            runStart = position
+            runFormat = format
+        position += len(value)
+    if runFormat is not None:
+        spans.append((runStart, position - runStart, runFormat))
+    return spans
+
+
+class SpanFormatter(Formatter):
+    """Whole-document formatting into spans, with the same formats the editor uses."""
+
+    def __init__(self):
+        Formatter.__init__(self)
+        self.formats = spanFormats()
+
+    def format(self, tokensource, outfile):
+        self.spans = formatTokens(tokensource, self.formats)
+
+
+def spanFormats():
+    formats = TokenFormats(styles, styles['Token.Name'])
+    formats[Text] = None
+    formats[Whitespace] = None
+    return formats
+
+
+def characterFormats(document, lexer):
+    formatter = CharacterFormatter()
+    highlight(document, lexer, formatter)
+    return len(formatter.data)
+
+
+def wholeSpans(document, lexer):
+    formatter = SpanFormatter()
+    highlight(document, lexer, formatter)
+    return len(formatter.spans)
+
+
+def blockByBlock(document, lexer):
+    lineLexer = LineLexer(lexer)
+    formats = spanFormats()
+    calls = 0
+    state = 0
+    for line in document.split("\n"):
+        (tokenSpans, state) = lineLexer.lexLine(line, state)
+        calls += len(formatSpans(tokenSpans, formats))
+    return calls
+
+
+def measure(label, fn, document, lexer, repeat, scale=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        calls = fn(document, lexer)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn(document, lexer)
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("%-42s %10.1f ms %10.1f MiB peak %10d setFormat calls" % (label, best * scale * 1000, peak / (1024 * 1024), calls * scale))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(os.path.join(root, "__init__.py"), encoding="utf-8") as sample:
+        sampleLines = sample.read().split("\n")
+    lines = (sampleLines * (args.lines // len(sampleLines) + 1))[:args.lines]
+    document = "\n".join(lines)
+    lexer = get_lexer_by_name("python")
+    print("%d lines, %d characters" % (len(lines), len(document)))
+
+    measure("whole document, per-character list", characterFormats, document, lexer, args.repeat)
+    measure("whole document, format spans", wholeSpans, document, lexer, args.repeat)
+    measure("block by block, format spans", blockByBlock, document, lexer, args.repeat)
+    # The old Pylighter re-ran the whole document for every block it was asked about
+    measure("old Pylighter opening the document (est.)", characterFormats, document, lexer, 1, scale=len(lines))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Per-run globals setup overhead: the old exec("from binaryninja import *")
+# plus exec("bv.update_analysis_and_wait()") into a fresh dict, against
+# copying the cached base namespace and calling the method directly.
+#
+# Run it with Binary Ninja's python on the path, or point --module at any
+# other large module to get a feel for the numbers without it.
+#
+#   python3 benchmarks/bench_namespace.py [--module binaryninja] [--runs 2000]
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from snippetlib.context import LazyGlobals, baseNamespace
+
+
+class FakeView:
+    def update_analysis_and_wait(self):
+        pass
+
+
+def context():
+    snippetGlobals = LazyGlobals()
+    snippetGlobals['bv'] = FakeView()
+    snippetGlobals['here'] = 0x1000
+    snippetGlobals.lazy(['current_hlil'], lambda: {'current_hlil': None})
+    return snippetGlobals
+
+
+def before(moduleName):
+    snippetGlobals = dict(context())
+    exec("from %s import *" % moduleName, snippetGlobals)
+    exec("bv.update_analysis_and_wait()", snippetGlobals)
+    return snippetGlobals
+
+
+def after(moduleName):
+    snippetGlobals = context().materialize(frozenset(['bv']), baseNamespace(moduleName))
+    snippetGlobals["bv"].update_analysis_and_wait()
+    return snippetGlobals
+
+
+def measure(label, fn, moduleName, runs):
+    fn(moduleName)
+    start = time.perf_counter()
+    for _ in range(runs):
+        snippetGlobals = fn(moduleName)
+    elapsed = time.perf_counter() - start
+    print("%-30s %8.1f us/run  (%d names)" % (label, elapsed / runs * 1e6, len(snippetGlobals)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="binaryninja")
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+    try:
+        __import__(args.module)
+    except ImportError:
+        sys.exit("%s is not importable, try --module with another package" % args.module)
+
+    measure("exec star-import per run", before, args.module, args.runs)
+    measure("cached base namespace", after, args.module, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# Line number gutter painting cost on a large snippet: the old NumberBar,
+# which looked up geometry, the cursor and fonts per visible block on every
+# paint and repainted on every updateRequest, against the cached one in
+# QCodeEditor. The old one is copied here, the current one is imported from
+# QCodeEditor with binaryninja and binaryninjaui stubbed out (fixed colors
+# and a plain monospace font), so only PySide6 is needed. Runs on the
+# offscreen platform.
+#
+#   python3 benchmarks/bench_numberbar.py [--lines 20000] [--paints 500] [--blinks 500]
+
+import os
+import sys
+import time
+import types
+import argparse
+import importlib
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6.QtCore import Qt, QRect, QPoint
+from PySide6.QtGui import QColor, QFont, QPainter
+from PySide6.QtWidgets import QApplication, QPlainTextEdit, QWidget
+
+numberBarColor = QColor(40, 40, 40)
+blockSelected = QColor(255, 255, 255)
+blockNormal = QColor(128, 128, 128)
+
+
+class ThemeColors:
+    def __getattr__(self, name):
+        return name
+
+
+def importEditor():
+    """QCodeEditor from the plugin folder, without running the plugin's __init__."""
+    themeColors = {"BackgroundHighlightDarkColor": numberBarColor, "TokenHighlightColor": blockSelected,
+                   "TokenSelectionColor": blockNormal}
+    binaryninja = types.ModuleType("binaryninja")
+    binaryninja.log_warn = print
+    binaryninjaui = types.ModuleType("binaryninjaui")
+    binaryninjaui.qt_major_version = 6
+    binaryninjaui.getMonospaceFont = lambda widget: QFont("monospace")
+    binaryninjaui.getThemeColor = lambda color: themeColors.get(color, blockNormal)
+    binaryninjaui.ThemeColor = ThemeColors()
+    sys.modules.setdefault("binaryninja", binaryninja)
+    sys.modules.setdefault("binaryninjaui", binaryninjaui)
+    plugin = types.ModuleType("snippets_plugin")
+    plugin.__path__ = [os.path.dirname(os.path.dirname(os.path.realpath(__file__)))]
+    sys.modules["snippets_plugin"] = plugin
+    return importlib.import_module("snippets_plugin.QCodeEditor").QCodeEditor
+
+
+class OldNumberBar(QWidget):
+
+    def __init__(self, editor):
+        QWidget.__init__(self, editor)
+        self.editor = editor
+        self.editor.blockCountChanged.connect(self.updateWidth)
+        self.editor.updateRequest.connect(self.updateContents)
+        self.font = editor.currentCharFormat().font()
+        self.paints = 0
+        self.updateWidth()
+
+    def paintEvent(self, event):
+        self.paints += 1
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), numberBarColor)
+        block = self.editor.firstVisibleBlock()
+        while block.isValid():
+            blockNumber = block.blockNumber()
+            block_top = self.editor.blockBoundingGeometry(block).translated(self.editor.contentOffset()).top()
+            if not block.isVisible() or block_top >= event.rect().bottom():
+                break
+            if blockNumber == self.editor.textCursor().blockNumber():
+                self.font.setBold(True)
+                painter.setPen(blockSelected)
+            else:
+                self.font.setBold(False)
+                painter.setPen(blockNormal)
+            painter.setFont(self.font)
+            paint_rect = QRect(0, block_top, self.width(), self.editor.fontMetrics().height())
+            painter.drawText(paint_rect, Qt.AlignLeft, str(blockNumber + 3))
+            block = block.next()
+        painter.end()
+        QWidget.paintEvent(self, event)
+
+    def getWidth(self):
+        return self.fontMetrics().horizontalAdvance(str(self.editor.blockCount())) + 10
+
+    def updateWidth(self):
+        width = self.getWidth()
+        if self.width() != width:
+            self.setFixedWidth(width)
+            self.editor.setViewportMargins(width, 0, 0, 0)
+
+    def updateContents(self, rect, scroll):
+        if scroll:
+            self.scroll(0, scroll)
+        else:
+            self.update(0, rect.y(), self.width(), rect.height())
+        if rect.contains(self.editor.viewport().rect()):
+            self.updateWidth()
+
+    def invalidate(self):
+        pass
+
+
+app = QApplication(sys.argv[:1])
+QCodeEditor = importEditor()
+
+
+class NewNumberBar(QCodeEditor.NumberBar):
+    """The shipped NumberBar, counting its paints."""
+
+    paints = 0
+
+    def paintEvent(self, event):
+        self.paints += 1
+        QCodeEditor.NumberBar.paintEvent(self, event)
+
+    def invalidate(self):
+        self.lines = None
+
+
+class Editor(QPlainTextEdit):
+
+    def __init__(self, barClass, text):
+        QPlainTextEdit.__init__(self)
+        font = QFont("monospace")
+        font.setPointSize(11)
+        self.setFont(font)
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.setPlainText(text)
+        self.bar = barClass(self)
+        self.resize(900, 1200)
+
+    def resizeEvent(self, *e):
+        cr = self.contentsRect()
+        self.bar.setGeometry(QRect(cr.left(), cr.top(), self.bar.getWidth(), cr.height()))
+        QPlainTextEdit.resizeEvent(self, *e)
+
+
+def measure(label, barClass, text, app, paints, blinks):
+    editor = Editor(barClass, text)
+    editor.show()
+    app.processEvents()
+    editor.verticalScrollBar().setValue(editor.verticalScrollBar().maximum() // 2)
+    editor.setTextCursor(editor.cursorForPosition(QPoint(10, editor.viewport().height() // 2)))
+    app.processEvents()
+
+    # Full repaints straight after a scroll, and repeated with nothing changed
+    start = time.perf_counter()
+    for _ in range(paints):
+        editor.bar.invalidate()
+        editor.bar.repaint()
+    cold = (time.perf_counter() - start) / paints
+    start = time.perf_counter()
+    for _ in range(paints):
+        editor.bar.repaint()
+    warm = (time.perf_counter() - start) / paints
+
+    # What a blinking cursor asks for: a small updateRequest without scrolling
+    cursorRect = editor.cursorRect()
+    editor.bar.paints = 0
+    start = time.perf_counter()
+    for _ in range(blinks):
+        editor.updateRequest.emit(cursorRect, 0)
+        app.processEvents()
+    blink = (time.perf_counter() - start) / blinks
+    print("%-10s %8.3f ms per paint after scroll %8.3f ms per repeated paint %8.3f ms and %4d gutter paints for %d blinks" % (
+        label, cold * 1000, warm * 1000, blink * 1000, editor.bar.paints, blinks))
+    editor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--paints", type=int, default=500)
+    parser.add_argument("--blinks", type=int, default=500)
+    args = parser.parse_args()
+
+    text = "\n".join("value_%d = some_function(%d)  # line %d" % (i, i, i) for i in range(args.lines))
+    print("%d lines, %s platform" % (args.lines, app.platformName()))
+    measure("old", OldNumberBar, text, app, args.paints, args.blinks)
+    measure("cached", NewNumberBar, text, app, args.paints, args.blinks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Measure the snippet discovery cost paid at plugin startup with the
+# manifest cold (walk + read every header) and warm (seed the registry from
+# snippets_manifest.json), plus the background validation that follows a
+# warm start. Action registration itself needs the UI and is not included.
+#
+#   python3 benchmarks/bench_startup.py [--snippets 3000] [--body-kb 64]
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from snippetlib.walker import walkSnippets
+from snippetlib.registry import SnippetRegistry
+from snippetlib.manifest import loadManifest, saveManifest
+
+
+def buildSnippets(root, count, bodySize):
+    body = ("DATA = %r\n" % ("x" * bodySize))
+    for i in range(count):
+        folder = os.path.join(root, "folder%d" % (i % 20))
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "snippet%d.py" % i), "w") as f:
+            f.write("#Snippet %d\n#Ctrl+Shift+%d\n%s" % (i, i % 10, body))
+
+
+def measure(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print("%-36s %8.1f ms" % (label, (time.perf_counter() - start) * 1000))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snippets", type=int, default=3000)
+    parser.add_argument("--body-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="snippetbench")
+    snippetDir = os.path.join(root, "snippets")
+    manifestPath = os.path.join(root, "snippets_manifest.json")
+    try:
+        buildSnippets(snippetDir, args.snippets, args.body_kb * 1024)
+        print("%d snippets with %d KiB bodies" % (args.snippets, args.body_kb))
+
+        def cold():
+            registry = SnippetRegistry()
+            registry.refresh(walkSnippets(snippetDir))
+            saveManifest(manifestPath, snippetDir, registry)
+            return registry
+
+        def warm():
+            registry = SnippetRegistry()
+            registry.seed(loadManifest(manifestPath, snippetDir))
+            return registry
+
+        measure("cold start (walk + headers + save)", cold)
+        registry = measure("warm start (manifest only)", warm)
+        diff = measure("background validation", lambda: registry.refresh(walkSnippets(snippetDir)))
+        print("validation touched %d entries" % diff.touched)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Compare the old os.walk based includeWalk against walkSnippets on a
+# synthetic snippet folder of ~20k files, most of them in places people
+# keep next to their snippets (.git, __pycache__, a virtualenv listed in
+# .snippetignore).
+#
+#   python3 benchmarks/bench_walker.py [--files 20000] [--repeat 5]
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from snippetlib.walker import walkSnippets
+from snippetlib.registry import SnippetRegistry
+
+
+def includeWalk(dir, includeExt):
+    filePaths = []
+    for (root, dirs, files) in os.walk(dir):
+        for f in files:
+            if os.path.splitext(f)[1] in includeExt and '.git' not in root:
+                filePaths.append(os.path.join(root, f))
+    return filePaths
+
+
+def buildTree(root, total):
+    # 5% real snippets spread over a few folders, the rest is noise
+    snippets = total // 20
+    noise = total - snippets
+    for i in range(snippets):
+        folder = os.path.join(root, "folder%d" % (i % 10))
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "snippet%d.py" % i), "w") as f:
+            f.write("#Snippet %d\n#\nprint(%d)\n" % (i, i))
+    buckets = [os.path.join(root, ".git", "objects"), os.path.join(root, "__pycache__"),
+               os.path.join(root, "venv", "lib", "python3", "site-packages", "pkg")]
+    for i in range(noise):
+        folder = os.path.join(buckets[i % len(buckets)], "%02x" % (i % 256))
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "file%d.py" % i), "w") as f:
+            f.write("x = 1\n")
+    with open(os.path.join(root, ".snippetignore"), "w") as f:
+        f.write("venv/\n")
+    return snippets
+
+
+def timeit(label, fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print("%-34s %8.1f ms  (%d results)" % (label, best * 1000, len(result)))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="snippetbench")
+    try:
+        snippets = buildTree(root, args.files)
+        print("%d files, %d snippets in %s" % (args.files, snippets, root))
+        timeit("includeWalk (os.walk)", lambda: includeWalk(root, ".py"), args.repeat)
+        timeit("walkSnippets (scandir, pruned)", lambda: list(walkSnippets(root)), args.repeat)
+
+        registry = SnippetRegistry()
+        registry.refresh(includeWalk(root, ".py"))
+        timeit("registry refresh, os.walk paths", lambda: (registry.refresh(includeWalk(root, ".py")), registry.entries)[1], args.repeat)
+        timeit("registry refresh, scandir entries", lambda: (registry.refresh(walkSnippets(root)), registry.entries)[1], args.repeat)
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
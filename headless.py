@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Run snippets against many binaries without the UI, e.g. for a nightly job:
+#
+#   python3 headless.py -s ~/.binaryninja/snippets/xrefs.py -o results.jsonl -j 8 bins/*
+#
+# Snippets use the normal two line header. Each one sees `bv`/`current_view`,
+# with `here`, `current_function` and the IL globals pointing at the entry
+# point (UI-only globals are None). Whatever a snippet leaves in `result` is
+# written out, one JSON line per binary and snippet. Needs a Binary Ninja
+# license that allows headless use.
+
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from snippetlib.walker import walkSnippets
+from snippetlib.codecache import CodeCache
+from snippetlib.context import LazyGlobals, baseNamespace, functionGlobals
+from snippetlib.watchdog import Watchdog, SnippetAborted
+
+uiNames = ['current_token', 'current_variable', 'current_il_index', 'current_il_function', 'current_il_instruction',
+           'current_il_basic_block', 'current_il_instructions', 'current_selection', 'current_ui_action_context',
+           'current_ui_context']
+
+codeCache = CodeCache()
+
+
+def headlessGlobals(bv, names):
+    snippetGlobals = LazyGlobals()
+    for name in uiNames:
+        snippetGlobals[name] = None
+    snippetGlobals['bv'] = bv
+    snippetGlobals['current_view'] = bv
+    snippetGlobals['flush_analysis'] = bv.update_analysis_and_wait
+    base = snippetGlobals.materialize(frozenset(), baseNamespace())
+    function = bv.entry_function
+    if function is not None:
+        return functionGlobals(base, function, names)
+    base['current_function'] = None
+    base['here'] = base['current_address'] = bv.entry_point
+    for name in ['current_llil', 'current_mlil', 'current_hlil', 'current_basic_block']:
+        base[name] = None
+    base['current_raw_offset'] = bv.get_data_offset_for_address(bv.entry_point)
+    return base
+
+
+def jsonable(value):
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def openView(binary):
+    import binaryninja
+    if hasattr(binaryninja, "load"):
+        return binaryninja.load(binary)
+    return binaryninja.open_view(binary)
+
+
+def processBinary(binary, snippets, timeout):
+    """Run every snippet against one binary, return a list of result records."""
+    records = []
+    start = time.perf_counter()
+    error = "unable to open binary"
+    try:
+        bv = openView(binary)
+    except Exception:
+        bv = None
+        error = traceback.format_exc()
+    loadTime = time.perf_counter() - start
+    if bv is None:
+        return [{"binary": binary, "snippet": None, "ok": False, "load_seconds": loadTime, "error": error}]
+    try:
+        for snippet in snippets:
+            record = {"binary": binary, "snippet": snippet, "load_seconds": loadTime}
+            start = time.perf_counter()
+            try:
+                compiled = codeCache.get(snippet)
+                record["description"] = compiled.description
+                snippetGlobals = headlessGlobals(bv, compiled.names)
+                timeLimit = float(compiled.options.get("timeout") or 0) or timeout
+                Watchdog(timeLimit=timeLimit).run(exec, compiled.code, snippetGlobals)
+                record["ok"] = True
+                record["result"] = jsonable(snippetGlobals.get("result"))
+            except SnippetAborted:
+                record["ok"] = False
+                record["error"] = "exceeded its time budget of %ss" % timeLimit
+            except Exception:
+                record["ok"] = False
+                record["error"] = traceback.format_exc()
+            record["run_seconds"] = time.perf_counter() - start
+            records.append(record)
+    finally:
+        bv.file.close()
+    return records
+
+
+def collectSnippets(paths):
+    snippets = []
+    for path in paths:
+        path = os.path.realpath(path)
+        if os.path.isdir(path):
+            # The example updater asks questions and downloads things, never batch it
+            snippets.extend(sorted(entry.path for entry in walkSnippets(path) if entry.name != "update_example_snippets.py"))
+        else:
+            snippets.append(path)
+    return snippets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run snippets against binaries without the Binary Ninja UI.")
+    parser.add_argument("binaries", nargs="+", help="Binaries (or databases) to open")
+    parser.add_argument("-s", "--snippet", action="append", required=True, dest="snippets",
+                        help="Snippet file or folder of snippets, may be repeated")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Binaries to process in parallel")
+    parser.add_argument("-t", "--timeout", type=float, default=None, help="Seconds each snippet may run per binary")
+    args = parser.parse_args()
+
+    snippets = collectSnippets(args.snippets)
+    if not snippets:
+        parser.error("no snippets found")
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            futures = {pool.submit(processBinary, binary, snippets, args.timeout): binary for binary in args.binaries}
+            for future in as_completed(futures):
+                try:
+                    records = future.result()
+                except Exception:
+                    records = [{"binary": futures[future], "snippet": None, "ok": False, "error": traceback.format_exc()}]
+                for record in records:
+                    failed += not record["ok"]
+                    output.write(json.dumps(record) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# Qt-free helpers shared by the snippet UI plugin. Nothing in here may import
+# binaryninjaui or PySide so it can be reused headlessly.
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import types
+import hashlib
+import marshal
+import tempfile
+import threading
+import importlib.util
+from collections import OrderedDict, namedtuple
+
+from .snippetfile import readSnippetFile, parseDirectives
+
+# names is the set of global names the code refers to, or None if it can reach
+# its globals dynamically and every context value has to be provided.
+# options holds the `# snippet:` directives from the top of the body.
+CompiledSnippet = namedtuple("CompiledSnippet", ["code", "contentHash", "description", "names", "options"])
+CacheEntry = namedtuple("CacheEntry", ["mtime", "size", "compiled"])
+
+# The two header lines are replaced by blank comments so line numbers in
+# tracebacks still match the file on disk.
+headerPadding = "# \n# \n"
+
+
+# Any of these means globals can be read without naming them
+dynamicNames = frozenset(["globals", "locals", "vars", "eval", "exec", "dir", "f_globals", "__dict__"])
+
+
+def referencedNames(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= referencedNames(const)
+    return names
+
+
+def analyzeNames(code):
+    names = referencedNames(code)
+    if names & dynamicNames:
+        return None
+    return frozenset(names)
+
+
+def compileSnippet(path, body, contentHash, description):
+    code = compile(headerPadding + body, path, 'exec')
+    return CompiledSnippet(code, contentHash, description, analyzeNames(code), parseDirectives(body))
+
+
+class CodeCache:
+    """LRU cache of compiled snippets keyed by path, validated by mtime/size and content hash.
+
+    If storeDir is set, compiled code is also marshalled to disk (much like
+    __pycache__) so the first run after a restart skips compilation too.
+    """
+
+    def __init__(self, capacity=128, storeDir=None):
+        self.capacity = capacity
+        self.storeDir = storeDir
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def invalidate(self, path):
+        with self.lock:
+            self.entries.pop(path, None)
+
+    def storePath(self, path):
+        name = hashlib.sha1(path.encode("utf-8")).hexdigest()
+        return os.path.join(self.storeDir, name + ".bin")
+
+    def loadStored(self, path):
+        if not self.storeDir:
+            return None
+        try:
+            with open(self.storePath(path), "rb") as f:
+                (magic, mtime, size, contentHash, description, code, names, options) = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if magic != importlib.util.MAGIC_NUMBER:
+            return None
+        return CacheEntry(mtime, size, CompiledSnippet(code, contentHash, description, names, options))
+
+    def writeStored(self, path, entry):
+        if not self.storeDir:
+            return
+        compiled = entry.compiled
+        record = (importlib.util.MAGIC_NUMBER, entry.mtime, entry.size, compiled.contentHash, compiled.description, compiled.code, compiled.names, compiled.options)
+        target = self.storePath(path)
+        # A temp file of its own, headless workers and other instances may share the folder
+        try:
+            os.makedirs(self.storeDir, exist_ok=True)
+            (handle, temp) = tempfile.mkstemp(prefix=os.path.basename(target) + ".", suffix=".tmp",
+                                              dir=os.path.dirname(target))
+        except OSError:
+            return
+        try:
+            with open(handle, "wb") as f:
+                marshal.dump(record, f)
+            os.replace(temp, target)
+        except (OSError, ValueError):
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
+
+    def get(self, path):
+        """Return the CompiledSnippet for `path`, compiling only if its contents changed."""
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.mtime == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry.compiled
+
+        if entry is None:
+            entry = self.loadStored(path)
+        if entry is not None and entry.mtime == stat.st_mtime_ns and entry.size == stat.st_size:
+            compiled = entry.compiled
+            self.hits += 1
+        else:
+            (description, hotkey, body) = readSnippetFile(path)
+            contentHash = hashlib.sha1(body.encode("utf-8")).hexdigest()
+            if entry is not None and entry.compiled.contentHash == contentHash:
+                # Touched but not edited, only the description may differ
+                compiled = entry.compiled._replace(description=description)
+                self.hits += 1
+            else:
+                compiled = compileSnippet(path, body, contentHash, description)
+                self.misses += 1
+            entry = CacheEntry(stat.st_mtime_ns, stat.st_size, compiled)
+            self.writeStored(path, entry)
+
+        with self.lock:
+            self.entries[path] = CacheEntry(stat.st_mtime_ns, stat.st_size, compiled)
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        return compiled
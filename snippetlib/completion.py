@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import re
+import time
+import bisect
+import keyword
+import types
+import typing
+import builtins
+
+from .context import contextNames
+
+# What the context globals hold, by name in the namespace or builtins (or
+# the type itself), so that e.g. `current_function.` completes without a
+# live context
+contextTypes = {
+    'bv': 'BinaryView',
+    'current_view': 'BinaryView',
+    'current_function': 'Function',
+    'current_basic_block': 'BasicBlock',
+    'current_llil': 'LowLevelILFunction',
+    'current_mlil': 'MediumLevelILFunction',
+    'current_hlil': 'HighLevelILFunction',
+    'current_variable': 'Variable',
+    'here': 'int',
+    'current_address': 'int',
+    'current_raw_offset': 'int',
+    'current_il_index': 'int',
+    # A bound method in the UI and headless alike
+    'flush_analysis': types.MethodType,
+}
+
+# The dotted name being typed at the end of a line
+expressionPattern = re.compile(r"(?:[A-Za-z_]\w*\.)*\w*$")
+
+missing = object()
+
+
+def instancesCallable(cls):
+    """Whether instances of cls are callable, callable(cls) is true for any class."""
+    return any("__call__" in vars(base) for base in getattr(cls, "__mro__", ()))
+
+
+class PrefixIndex:
+    """Sorted names, looked up by prefix with bisect."""
+
+    def __init__(self, names):
+        self.names = sorted(set(names))
+
+    def matches(self, prefix):
+        start = bisect.bisect_left(self.names, prefix)
+        end = bisect.bisect_right(self.names, prefix + "\U0010ffff", start)
+        return self.names[start:end]
+
+
+class SnippetCompleter:
+    """Tab completion over what a snippet sees: the namespace, builtins, keywords and context globals.
+
+    complete(line, state) is called with state 0, 1, 2... to cycle through
+    the candidates and returns the line with its last dotted name completed
+    (callables get a "(" appended), or None once out of candidates. Context
+    globals complete as the classes in contextTypes, and properties as the
+    class their getter is annotated to return. namespace is a callable
+    returning the current namespace dict (see baseNamespace), the name index
+    and the attribute lists are only rebuilt when it returns a different
+    one. The candidates for a line are reused while cycling, and lastLatency
+    holds how long the last search took.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.indexed = None
+        self.index = None
+        # id(object) -> (object, PrefixIndex of its attributes), holding on to
+        # the object so that its id isn't reused
+        self.attributes = {}
+        self.line = None
+        self.candidates = ("", None, [])
+        self.lastLatency = 0.0
+
+    def currentNamespace(self):
+        namespace = self.namespace()
+        if namespace is not self.indexed:
+            self.index = PrefixIndex(list(namespace) + dir(builtins) + keyword.kwlist + contextNames)
+            self.attributes = {}
+            self.indexed = namespace
+            self.line = None
+        return namespace
+
+    def attributeIndex(self, value):
+        entry = self.attributes.get(id(value))
+        if entry is None:
+            try:
+                names = dir(value)
+            except Exception:
+                names = []
+            entry = (value, PrefixIndex(names))
+            self.attributes[id(value)] = entry
+        return entry[1]
+
+    def lookup(self, namespace, expression):
+        parts = expression.split(".")
+        name = contextTypes.get(parts[0], parts[0])
+        if isinstance(name, type):
+            value = name
+        elif name in namespace:
+            value = namespace[name]
+        else:
+            value = getattr(builtins, name, missing)
+        for part in parts[1:]:
+            if value is missing:
+                break
+            try:
+                value = getattr(value, part)
+            except Exception:
+                value = missing
+            # Walking a class gives property objects, carry on with what they return
+            if isinstance(value, property):
+                value = self.propertyType(namespace, value)
+        return value
+
+    def propertyType(self, namespace, prop):
+        """The class prop's getter is annotated to return, missing if that can't be told."""
+        annotation = getattr(prop.fget, "__annotations__", {}).get("return", missing)
+        if isinstance(annotation, str):
+            annotation = namespace.get(annotation, getattr(builtins, annotation, missing))
+        # e.g. List[Function] completes like a list
+        annotation = typing.get_origin(annotation) or annotation
+        return annotation if isinstance(annotation, type) else missing
+
+    def search(self, namespace, line):
+        """(line up to the name, owner or None, [candidate names]) for the dotted name at the end of line."""
+        match = expressionPattern.search(line)
+        expression = match.group()
+        head = line[:match.start()]
+        if "." not in expression:
+            if not expression:
+                return (head, None, [])
+            return (head, None, self.index.matches(expression))
+        (ownerExpression, _, prefix) = expression.rpartition(".")
+        owner = self.lookup(namespace, ownerExpression)
+        if owner is missing:
+            return (head, None, [])
+        names = self.attributeIndex(owner).matches(prefix)
+        # Like rlcompleter, private names only once asked for
+        if not prefix:
+            names = [name for name in names if not name.startswith("_")]
+        elif prefix == "_":
+            names = [name for name in names if not name.startswith("__")]
+        return (head + ownerExpression + ".", owner, names)
+
+    def complete(self, line, state):
+        namespace = self.currentNamespace()
+        if line != self.line:
+            start = time.perf_counter()
+            self.candidates = self.search(namespace, line)
+            self.line = line
+            self.lastLatency = time.perf_counter() - start
+        (head, owner, names) = self.candidates
+        if state >= len(names):
+            return None
+        name = names[state]
+        text = head + name
+        if owner is None and name in contextNames:
+            # Context globals only have a type here, what matters is whether its instances are callable
+            kind = self.lookup(namespace, name)
+            isCallable = kind is not missing and instancesCallable(kind)
+        else:
+            if owner is None:
+                value = self.lookup(namespace, name)
+            else:
+                try:
+                    value = getattr(owner, name)
+                except Exception:
+                    value = missing
+            isCallable = value is not missing and callable(value)
+        if isCallable:
+            text += "("
+        return text
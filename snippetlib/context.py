@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import sys
+import time
+import threading
+import importlib
+
+# name -> [lookups, total seconds] for every lazily resolved context value
+contextTimings = {}
+timingLock = threading.Lock()
+
+
+def recordTiming(name, elapsed):
+    with timingLock:
+        counter = contextTimings.setdefault(name, [0, 0.0])
+        counter[0] += 1
+        counter[1] += elapsed
+
+
+def contextTimingReport():
+    """One line per context value, slowest total first."""
+    with timingLock:
+        rows = sorted(contextTimings.items(), key=lambda item: item[1][1], reverse=True)
+    return "\n".join("%-28s %6d lookups %10.3f ms total" % (name, count, seconds * 1000)
+                     for (name, (count, seconds)) in rows)
+
+
+# (module, module spec, namespace) for the last star-import we built
+baseNamespaceCache = (None, None, None)
+
+
+def baseNamespace(moduleName="binaryninja"):
+    """The result of `from <moduleName> import *`, built once and reused.
+
+    importlib.reload() keeps the module object but gives it a new __spec__,
+    so the cache is rebuilt after a reload. Callers must copy the result.
+    """
+    global baseNamespaceCache
+    module = sys.modules.get(moduleName)
+    if module is None:
+        module = importlib.import_module(moduleName)
+    (cachedModule, cachedSpec, namespace) = baseNamespaceCache
+    if cachedModule is not module or cachedSpec is not module.__spec__:
+        namespace = {}
+        exec("from %s import *" % moduleName, namespace)
+        baseNamespaceCache = (module, module.__spec__, namespace)
+    return namespace
+
+
+class LazyGlobals(dict):
+    """Globals for exec() that compute context values the first time they are looked up.
+
+    Resolvers are registered with lazy(names, resolver) and return a dict with
+    the values of some or all of `names`; names missing from the result stay
+    undefined, exactly as if they had never been set. A value the snippet
+    assigns itself always wins over the resolver.
+    """
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.resolvers = {}
+
+    def lazy(self, names, resolver):
+        names = tuple(names)
+        for name in names:
+            self.resolvers[name] = (names, resolver)
+
+    def resolve(self, name):
+        (names, resolver) = self.resolvers[name]
+        for other in names:
+            self.resolvers.pop(other, None)
+        start = time.perf_counter()
+        values = resolver()
+        recordTiming(name if len(names) == 1 else "/".join(names), time.perf_counter() - start)
+        for (key, value) in values.items():
+            if not dict.__contains__(self, key):
+                dict.__setitem__(self, key, value)
+
+    def materialize(self, names=None, base=None):
+        """Resolve the context values in `names` (all of them if None) and return a plain dict.
+
+        exec() is faster with an exact dict, so once the compiler has told us
+        which names a snippet uses there is no reason to stay lazy. If given,
+        base (see baseNamespace) is copied in underneath the context values.
+        """
+        for name in list(self.resolvers):
+            if name in self.resolvers and (names is None or name in names):
+                self.resolve(name)
+        result = dict(base) if base is not None else {}
+        result.update(self)
+        return result
+
+    def __missing__(self, name):
+        if name not in self.resolvers:
+            raise KeyError(name)
+        self.resolve(name)
+        return dict.__getitem__(self, name)
+
+    def __contains__(self, name):
+        if dict.__contains__(self, name):
+            return True
+        if name in self.resolvers:
+            self.resolve(name)
+            return dict.__contains__(self, name)
+        return False
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+
+# Values tied to the cursor rather than the function, meaningless when iterating
+locationNames = ['current_token', 'current_variable', 'current_il_index', 'current_il_function',
+                 'current_il_instruction', 'current_il_basic_block', 'current_il_instructions']
+
+# Every global a snippet gets on top of the binaryninja star-import
+contextNames = ['bv', 'current_view', 'here', 'current_address', 'current_function', 'current_selection',
+                'current_raw_offset', 'current_llil', 'current_mlil', 'current_hlil', 'current_basic_block',
+                'current_ui_action_context', 'current_ui_context', 'flush_analysis'] + locationNames
+
+
+def functionGlobals(base, function, names=None):
+    """Globals for running a snippet against `function` as if the cursor were at its start.
+
+    base is a materialized globals dict (see LazyGlobals.materialize), the
+    function specific values are only computed if `names` refers to them.
+    """
+    snippetGlobals = LazyGlobals(base)
+    for name in locationNames:
+        snippetGlobals[name] = None
+    snippetGlobals['current_function'] = function
+    snippetGlobals['here'] = function.start
+    snippetGlobals['current_address'] = function.start
+    snippetGlobals['current_selection'] = None
+    view = function.view
+    for name in ['current_mlil', 'current_hlil', 'current_llil', 'current_basic_block', 'current_raw_offset']:
+        snippetGlobals.pop(name, None)
+    snippetGlobals.lazy(['current_mlil'], lambda: {'current_mlil': function.mlil_if_available})
+    snippetGlobals.lazy(['current_hlil'], lambda: {'current_hlil': function.hlil_if_available})
+    snippetGlobals.lazy(['current_llil'], lambda: {'current_llil': function.llil_if_available})
+    snippetGlobals.lazy(['current_basic_block'], lambda: {'current_basic_block': function.get_basic_block_at(function.start)})
+    snippetGlobals.lazy(['current_raw_offset'], lambda: {'current_raw_offset': view.get_data_offset_for_address(function.start)})
+    return snippetGlobals.materialize(names)
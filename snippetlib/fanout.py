@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+ItemResult = namedtuple("ItemResult", ["item", "result", "error", "duration"])
+
+
+def runForEach(code, items, makeGlobals, maxWorkers, shouldStop=None):
+    """exec `code` once per item on a pool of threads and gather what each run left in `result`.
+
+    makeGlobals(item) builds the globals for one run. Exceptions are caught
+    per item and reported as formatted tracebacks. shouldStop is polled
+    before each item starts, items that never ran are left out.
+    """
+    def runOne(item):
+        if shouldStop is not None and shouldStop():
+            return None
+        start = time.perf_counter()
+        try:
+            snippetGlobals = makeGlobals(item)
+            exec(code, snippetGlobals)
+            return ItemResult(item, snippetGlobals.get("result"), None, time.perf_counter() - start)
+        except Exception:
+            return ItemResult(item, None, traceback.format_exc(), time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=max(1, maxWorkers), thread_name_prefix="snippet") as pool:
+        results = list(pool.map(runOne, items))
+    return [result for result in results if result is not None]
+
+
+def formatReport(title, results, describe, maxResultLength=200):
+    """Markdown summary of runForEach results, describe(item) names an item."""
+    errors = [result for result in results if result.error]
+    total = sum(result.duration for result in results)
+    lines = ["# %s" % title, "",
+             "%d runs, %d failed, %.2fs of work" % (len(results), len(errors), total), "",
+             "| Item | Result | Time |", "| --- | --- | --- |"]
+    for result in results:
+        if result.error:
+            value = "**%s**" % result.error.strip().splitlines()[-1]
+        else:
+            value = repr(result.result)
+            if len(value) > maxResultLength:
+                value = value[:maxResultLength] + "..."
+        lines.append("| %s | %s | %.3fs |" % (describe(result.item), value.replace("|", "\\|"), result.duration))
+    for result in errors:
+        lines += ["", "## %s" % describe(result.item), "", "```", result.error.rstrip(), "```"]
+    return "\n".join(lines)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import json
+import math
+import tempfile
+import threading
+from collections import deque, namedtuple
+
+RunRecord = namedtuple("RunRecord", ["path", "contentHash", "start", "wall", "cpu", "peak", "outcome", "error"])
+RunStats = namedtuple("RunStats", ["count", "failures", "p50", "p95"])
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(values)))
+    return values[rank - 1]
+
+
+class RunHistory:
+    """The last `limit` snippet runs, kept in memory and appended to a JSONL file.
+
+    The file is allowed to grow to twice the limit before it is rewritten
+    with just the newest records, so appends stay cheap.
+    """
+
+    def __init__(self, path, limit=5000):
+        self.path = path
+        self.limit = limit
+        self.records = None
+        self.lines = 0
+        self.statsCache = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        self.records = deque(maxlen=self.limit)
+        self.lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as historyFile:
+                for line in historyFile:
+                    self.lines += 1
+                    try:
+                        self.records.append(RunRecord(**json.loads(line)))
+                    except (ValueError, TypeError):
+                        continue
+        except OSError:
+            pass
+
+    def ensureLoaded(self):
+        if self.records is None:
+            self.load()
+
+    def append(self, record):
+        with self.lock:
+            self.ensureLoaded()
+            self.records.append(record)
+            self.statsCache = None
+            try:
+                if self.lines >= 2 * self.limit:
+                    self.compact()
+                else:
+                    with open(self.path, "a", encoding="utf-8") as historyFile:
+                        historyFile.write(json.dumps(record._asdict()) + "\n")
+                    self.lines += 1
+            except OSError:
+                pass
+
+    def compact(self):
+        # A temp file of its own, so instances sharing the history never write into each other's
+        (handle, temp) = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp",
+                                          dir=os.path.dirname(self.path) or ".")
+        try:
+            with open(handle, "w", encoding="utf-8") as historyFile:
+                for record in self.records:
+                    historyFile.write(json.dumps(record._asdict()) + "\n")
+            os.replace(temp, self.path)
+        except OSError:
+            try:
+                os.unlink(temp)
+            except OSError:
+                pass
+            raise
+        self.lines = len(self.records)
+
+    def runs(self, path=None):
+        with self.lock:
+            self.ensureLoaded()
+            return [record for record in self.records if path is None or record.path == path]
+
+    def stats(self):
+        """RunStats (wall clock p50/p95 in seconds) per snippet path."""
+        with self.lock:
+            if self.statsCache is None:
+                self.ensureLoaded()
+                durations = {}
+                failures = {}
+                for record in self.records:
+                    # Cached results come back instantly and would hide the real run time
+                    if record.outcome == "cached":
+                        continue
+                    durations.setdefault(record.path, []).append(record.wall)
+                    if record.outcome != "ok":
+                        failures[record.path] = failures.get(record.path, 0) + 1
+                self.statsCache = {}
+                for (path, values) in durations.items():
+                    values.sort()
+                    self.statsCache[path] = RunStats(len(values), failures.get(path, 0),
+                                                     percentile(values, 50), percentile(values, 95))
+            return self.statsCache
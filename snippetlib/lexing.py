@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+
+from pygments.lexer import RegexLexer
+from pygments.token import Error, Whitespace, _TokenType
+
+rootStack = ("root",)
+
+
+def lexWithStack(lexer, text, stack):
+    """RegexLexer.get_tokens_unprocessed, but also returning the state stack it ended with.
+
+    Returns ([(position, tokentype, value)], stack). Like pygments, a newline
+    no rule matched resets to the root state, so an unterminated string
+    ends with its line. States that span lines, e.g. triple quoted strings,
+    match their newlines themselves and stay on the stack.
+    """
+    tokens = []
+    pos = 0
+    tokendefs = lexer._tokens
+    statestack = list(stack)
+    statetokens = tokendefs[statestack[-1]]
+    while True:
+        for (rexmatch, action, newState) in statetokens:
+            m = rexmatch(text, pos)
+            if not m:
+                continue
+            if action is not None:
+                if type(action) is _TokenType:
+                    tokens.append((pos, action, m.group()))
+                else:
+                    tokens.extend(action(lexer, m))
+            pos = m.end()
+            if newState is not None:
+                if isinstance(newState, tuple):
+                    for state in newState:
+                        if state == "#pop":
+                            if len(statestack) > 1:
+                                statestack.pop()
+                        elif state == "#push":
+                            statestack.append(statestack[-1])
+                        else:
+                            statestack.append(state)
+                elif isinstance(newState, int):
+                    if abs(newState) >= len(statestack):
+                        del statestack[1:]
+                    else:
+                        del statestack[newState:]
+                elif newState == "#push":
+                    statestack.append(statestack[-1])
+                statetokens = tokendefs[statestack[-1]]
+            break
+        else:
+            if pos >= len(text):
+                break
+            if text[pos] == "\n":
+                statestack = ["root"]
+                statetokens = tokendefs["root"]
+                tokens.append((pos, Whitespace, "\n"))
+            else:
+                tokens.append((pos, Error, text[pos]))
+            pos += 1
+    return (tokens, tuple(statestack))
+
+
+class LineLexer:
+    """Lex a document one line at a time, carrying the lexer state from line to line.
+
+    A state is a pygments state stack interned as a small int, so it can be
+    kept with QSyntaxHighlighter.setCurrentBlockState. Lines are lexed with
+    their newline so rules anchored at the end of a line still match, and
+    results are cached by (incoming state, text). Lexers that are not
+    RegexLexers are lexed line by line from scratch. Safe to share between
+    the UI thread and a background lexer.
+    """
+
+    def __init__(self, lexer, cacheSize=4096):
+        self.lexer = lexer
+        self.stateful = isinstance(lexer, RegexLexer)
+        self.stacks = [rootStack]
+        self.stackIds = {rootStack: 0}
+        self.cache = OrderedDict()
+        self.cacheSize = cacheSize
+        self.lock = threading.Lock()
+
+    def stateId(self, stack):
+        with self.lock:
+            state = self.stackIds.get(stack)
+            if state is None:
+                state = len(self.stacks)
+                self.stacks.append(stack)
+                self.stackIds[stack] = state
+            return state
+
+    def lexLine(self, text, state=0):
+        """Return ([(start, length, tokentype)], outgoing state) for one line, without its newline."""
+        key = (state, text)
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                return cached
+            stack = self.stacks[state] if 0 <= state < len(self.stacks) else rootStack
+        line = text + "\n"
+        if self.stateful:
+            (tokens, endStack) = lexWithStack(self.lexer, line, stack)
+            outState = self.stateId(endStack)
+        else:
+            tokens = self.lexer.get_tokens_unprocessed(line)
+            outState = 0
+        spans = []
+        for (start, token, value) in tokens:
+            length = min(len(value), len(text) - start)
+            if length > 0:
+                spans.append((start, length, token))
+        result = (spans, outState)
+        with self.lock:
+            self.cache[key] = result
+            if len(self.cache) > self.cacheSize:
+                self.cache.popitem(last=False)
+        return result
+
+
+class TokenFormats(dict):
+    """Maps pygments token types to formats given by token name, e.g. {"Token.Literal.String": fmt}.
+
+    A token type without its own entry gets the format of its nearest parent
+    that has one (or default), resolved once per type and then kept.
+    """
+
+    def __init__(self, formats, default, tokens=()):
+        dict.__init__(self)
+        self.formats = formats
+        self.default = default
+        for token in tokens:
+            self.__missing__(token)
+
+    def __missing__(self, token):
+        parent = token
+        while parent is not None and str(parent) not in self.formats:
+            parent = parent.parent
+        value = self.default if parent is None else self.formats[str(parent)]
+        self[token] = value
+        return value
+
+
+def formatSpans(tokenSpans, formats):
+    """Turn (start, length, tokentype) spans into (start, length, format) runs.
+
+    Neighbouring tokens with the same format become one run. Token types
+    whose format is None (typically whitespace) get no format of their own
+    and just extend the run they touch.
+    """
+    spans = []
+    runStart = runEnd = 0
+    runFormat = None
+    for (start, length, token) in tokenSpans:
+        format = formats[token]
+        if start == runEnd and (format is None or format is runFormat):
+            runEnd += length
+            continue
+        if format is None:
+            continue
+        if runFormat is not None:
+            spans.append((runStart, runEnd - runStart, runFormat))
+        runStart = start
+        runEnd = start + length
+        runFormat = format
+    if runFormat is not None:
+        spans.append((runStart, runEnd - runStart, runFormat))
+    return spans
+
+
+def lexLines(lineLexer, lines, formats, cancelled=None):
+    """Lex a whole document, given as its lines, starting from the root state.
+
+    Returns [(line, format spans, outgoing state)], or None as soon as
+    cancelled() returns true (checked every 256 lines).
+    """
+    results = []
+    state = 0
+    for (number, line) in enumerate(lines):
+        if cancelled is not None and number % 256 == 0 and cancelled():
+            return None
+        (tokenSpans, state) = lineLexer.lexLine(line, state)
+        results.append((line, formatSpans(tokenSpans, formats), state))
+    return results
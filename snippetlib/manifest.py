@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import json
+import tempfile
+
+from .registry import SnippetEntry
+
+manifestVersion = 1
+
+
+def loadManifest(manifestPath, root):
+    """Return the SnippetEntry list saved for root, or None if there is no usable manifest."""
+    try:
+        with open(manifestPath, "r", encoding="utf-8") as manifestFile:
+            data = json.load(manifestFile)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != manifestVersion or data.get("root") != root:
+        return None
+    try:
+        return [SnippetEntry(**item) for item in data["snippets"]]
+    except (KeyError, TypeError):
+        return None
+
+
+def saveManifest(manifestPath, root, entries):
+    data = {
+        "version": manifestVersion,
+        "root": root,
+        "snippets": [entry._asdict() for entry in entries],
+    }
+    # A temp file of its own, so concurrent saves never write into each other's
+    try:
+        (handle, temp) = tempfile.mkstemp(prefix=os.path.basename(manifestPath) + ".", suffix=".tmp",
+                                          dir=os.path.dirname(manifestPath) or ".")
+    except OSError:
+        return False
+    try:
+        with open(handle, "w", encoding="utf-8") as manifestFile:
+            json.dump(data, manifestFile)
+        os.replace(temp, manifestPath)
+    except OSError:
+        try:
+            os.unlink(temp)
+        except OSError:
+            pass
+        return False
+    return True
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import json
+from collections import OrderedDict
+
+pipelineFileName = "pipelines.json"
+
+
+def loadPipelines(path, root):
+    """Read named pipelines, returning an ordered {name: [absolute snippet paths]}.
+
+    The file maps each pipeline name to the snippets it runs in order, with
+    paths relative to root:
+
+        {"Find and annotate": ["collect_addresses.py", "tools/annotate.py"]}
+
+    A missing file means no pipelines, a malformed one raises ValueError.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as pipelineFile:
+            data = json.load(pipelineFile, object_pairs_hook=OrderedDict)
+    except FileNotFoundError:
+        return OrderedDict()
+    except (OSError, ValueError) as e:
+        raise ValueError("unable to read %s: %s" % (path, e))
+    if not isinstance(data, dict):
+        raise ValueError("%s should hold an object mapping pipeline names to lists of snippets" % path)
+    pipelines = OrderedDict()
+    for (name, stages) in data.items():
+        if not name or not isinstance(stages, list) or not stages or not all(isinstance(s, str) for s in stages):
+            raise ValueError("pipeline %r in %s should be a non-empty list of snippet paths" % (name, path))
+        pipelines[name] = [os.path.normpath(os.path.join(root, stage)) for stage in stages]
+    return pipelines
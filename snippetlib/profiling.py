@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import io
+import os
+import re
+import pstats
+import cProfile
+from datetime import datetime
+
+
+def profiledExec(code, snippetGlobals):
+    """exec() under cProfile, returning the profiler even if the snippet raised (see profiler.error)."""
+    profiler = cProfile.Profile()
+    profiler.error = None
+    profiler.enable()
+    try:
+        exec(code, snippetGlobals)
+    except BaseException as e:
+        profiler.error = e
+    finally:
+        profiler.disable()
+    return profiler
+
+
+def profileFolder(profileRoot, snippetName):
+    safeName = re.sub(r"[^\w.-]+", "_", snippetName).strip("_") or "snippet"
+    return os.path.join(profileRoot, safeName)
+
+
+def saveProfile(profiler, profileRoot, snippetName):
+    """Write a .pstats file (loadable by pstats, snakeviz, ...) for this run and return its path."""
+    folder = profileFolder(profileRoot, snippetName)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, datetime.now().strftime("%Y%m%d-%H%M%S-%f") + ".pstats")
+    profiler.dump_stats(path)
+    return path
+
+
+def hotSpots(profiler, limit=30, sortKey="cumulative"):
+    """The top `limit` entries of a profile as text."""
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.strip_dirs().sort_stats(sortKey).print_stats(limit)
+    return output.getvalue()
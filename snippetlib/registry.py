@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import hashlib
+import threading
+from collections import namedtuple
+
+from .snippetfile import readSnippetHeader
+
+SnippetEntry = namedtuple("SnippetEntry", ["path", "mtime", "size", "headerHash", "description", "hotkey", "hasCode"])
+
+
+def headerHash(description, hotkey, hasCode):
+    header = "%s\n%s\n%d" % (description, hotkey, hasCode)
+    return hashlib.sha1(header.encode("utf-8")).hexdigest()
+
+
+class RegistryDiff:
+    """What changed between two refreshes of a SnippetRegistry."""
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.changed = []   # (old, new) pairs whose header changed
+        self.refreshed = 0  # files that changed on disk but kept the same header
+
+    @property
+    def touched(self):
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+    def __bool__(self):
+        return self.touched > 0
+
+    def batches(self, size):
+        """Split into diffs of at most `size` touched entries, removals first."""
+        items = [("removed", entry) for entry in self.removed] + \
+                [("changed", pair) for pair in self.changed] + \
+                [("added", entry) for entry in self.added]
+        for start in range(0, len(items), size):
+            batch = RegistryDiff()
+            for (kind, item) in items[start:start + size]:
+                getattr(batch, kind).append(item)
+            yield batch
+
+    def __repr__(self):
+        return "<RegistryDiff added=%d removed=%d changed=%d refreshed=%d>" % (
+            len(self.added), len(self.removed), len(self.changed), self.refreshed)
+
+
+class SnippetRegistry:
+    """In-memory index of snippet files keyed by path.
+
+    refresh() stats every candidate file and only re-reads the header of files
+    whose mtime or size moved, so reloading an unchanged tree never opens a file.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.entries.values()))
+
+    def get(self, path):
+        return self.entries.get(path)
+
+    def readEntry(self, path, stat):
+        (description, hotkey, hasCode) = readSnippetHeader(path)
+        return SnippetEntry(path, stat.st_mtime_ns, stat.st_size,
+                            headerHash(description, hotkey, hasCode), description, hotkey, hasCode)
+
+    def seed(self, entries):
+        """Populate the registry from saved entries (see manifest.py) without touching the disk."""
+        diff = RegistryDiff()
+        with self.lock:
+            for entry in entries:
+                if entry.path not in self.entries:
+                    self.entries[entry.path] = entry
+                    diff.added.append(entry)
+        return diff
+
+    def refresh(self, snippets, progress=None):
+        """Diff the registry against `snippets` (every snippet currently on disk) and update it.
+
+        Items are either paths or os.DirEntry objects from walkSnippets, whose
+        cached stat result is reused. progress, if given, is called with the
+        number of files checked so far every hundred files.
+        """
+        diff = RegistryDiff()
+        with self.lock:
+            seen = set()
+            for (count, snippet) in enumerate(snippets, 1):
+                if progress is not None and count % 100 == 0:
+                    progress(count)
+                try:
+                    if isinstance(snippet, str):
+                        path = snippet
+                        stat = os.stat(path)
+                    else:
+                        path = snippet.path
+                        stat = snippet.stat()
+                except OSError:
+                    continue
+                seen.add(path)
+                old = self.entries.get(path)
+                if old is not None and old.mtime == stat.st_mtime_ns and old.size == stat.st_size:
+                    continue
+                entry = self.readEntry(path, stat)
+                self.entries[path] = entry
+                if old is None:
+                    diff.added.append(entry)
+                elif old.headerHash != entry.headerHash:
+                    diff.changed.append((old, entry))
+                else:
+                    diff.refreshed += 1
+
+            for path in [p for p in self.entries if p not in seen]:
+                diff.removed.append(self.entries.pop(path))
+        return diff
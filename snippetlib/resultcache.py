@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+
+from .context import locationNames
+
+# Globals whose value depends on where the cursor is, a cached result is only
+# reused for the same location if the snippet refers to any of them
+locationDependentNames = frozenset(locationNames + [
+    'current_function', 'here', 'current_address', 'current_selection', 'current_raw_offset',
+    'current_llil', 'current_mlil', 'current_hlil', 'current_basic_block',
+    'current_ui_action_context', 'current_ui_context'])
+
+
+def usesLocation(names):
+    return names is None or not names.isdisjoint(locationDependentNames)
+
+
+class ResultCache:
+    """LRU cache of what `cacheable` snippets left in `result`.
+
+    Keys are built by the caller from the snippet's content hash, the view,
+    its analysis generation and, if it matters, the cursor location. Results
+    are handed out as is, so a cached result must not be mutated.
+    """
+
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """(True, result) if key is cached, else (False, None)."""
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return (False, None)
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return (True, self.entries[key])
+
+    def put(self, key, result):
+        with self.lock:
+            if self.capacity <= 0:
+                return
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+    def discard(self, predicate):
+        """Drop every entry whose key predicate(key) is true for."""
+        with self.lock:
+            for key in [key for key in self.entries if predicate(key)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import threading
+from collections import deque
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+
+class SnippetRun:
+    def __init__(self, key, name, viewKey, start):
+        self.key = key
+        self.name = name
+        self.viewKey = viewKey
+        self.start = start
+        self.state = QUEUED
+        self.error = None
+        self.queuedAt = time.time()
+        self.startedAt = None
+        self.finishedAt = None
+
+    @property
+    def duration(self):
+        if self.startedAt is None:
+            return None
+        return (self.finishedAt or time.time()) - self.startedAt
+
+    def __repr__(self):
+        return "<SnippetRun %s %s>" % (self.name, self.state)
+
+
+class SnippetScheduler:
+    """Decides when queued snippet runs may start.
+
+    At most maxConcurrent runs execute at once, and runs sharing a viewKey
+    (anything hashable identifying the view, None for no view) execute one
+    after another so their undo actions never interleave. Queuing a snippet
+    that is already waiting for the same view is a no-op. onDiscard, if
+    given, is called with every run that is dropped without running: a
+    duplicate submission, or a queued run whose start failed.
+    """
+
+    def __init__(self, maxConcurrent=4, historySize=50, onDiscard=None):
+        self.maxConcurrent = maxConcurrent
+        self.onDiscard = onDiscard
+        self.queued = []
+        self.running = []
+        self.history = deque(maxlen=historySize)
+        self.lock = threading.Lock()
+
+    def submit(self, key, name, viewKey, start):
+        """Queue `start` (called with the SnippetRun once it may run) and return the run."""
+        duplicate = None
+        with self.lock:
+            for run in self.queued:
+                if run.key == key and run.viewKey == viewKey:
+                    duplicate = run
+                    break
+            else:
+                run = SnippetRun(key, name, viewKey, start)
+                self.queued.append(run)
+        if duplicate is not None:
+            self.discarded(SnippetRun(key, name, viewKey, start))
+            return duplicate
+        self.pump()
+        return run
+
+    def finished(self, run, error=None):
+        with self.lock:
+            run.state = FAILED if error else FINISHED
+            run.error = error
+            run.finishedAt = time.time()
+            if run in self.running:
+                self.running.remove(run)
+            self.history.append(run)
+        self.pump()
+
+    def pump(self):
+        starting = []
+        with self.lock:
+            busy = set(run.viewKey for run in self.running if run.viewKey is not None)
+            for run in list(self.queued):
+                if len(self.running) >= max(1, self.maxConcurrent):
+                    break
+                if run.viewKey is not None and run.viewKey in busy:
+                    continue
+                self.queued.remove(run)
+                self.running.append(run)
+                run.state = RUNNING
+                run.startedAt = time.time()
+                if run.viewKey is not None:
+                    busy.add(run.viewKey)
+                starting.append(run)
+        for run in starting:
+            try:
+                run.start(run)
+            except Exception as e:
+                self.finished(run, "%s: %s" % (type(e).__name__, e))
+                self.discarded(run)
+
+    def discarded(self, run):
+        if self.onDiscard is not None:
+            self.onDiscard(run)
+
+    def hasQueued(self, viewKey):
+        with self.lock:
+            return any(run.viewKey == viewKey for run in self.queued)
+
+    def isIdle(self, viewKey):
+        """Whether nothing is queued or running for viewKey."""
+        with self.lock:
+            return not any(run.viewKey == viewKey for run in self.queued + self.running)
+
+    def runs(self):
+        """Snapshot of every known run: queued, running and recently finished."""
+        with self.lock:
+            return list(self.queued) + list(self.running) + list(reversed(self.history))
+
+
+class AnalysisUpdates:
+    """Coalesces analysis updates requested by snippet runs, per view.
+
+    A run asks for an update with request(). The update itself only happens
+    in flushIfIdle once no other run is waiting for the same view, so a burst
+    of snippets against one view waits for analysis once at the end. A run
+    that was waited on but dropped without running leaves its update to
+    needsFlush, see SnippetScheduler.onDiscard.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def request(self, viewKey, view):
+        with self.lock:
+            self.pending[viewKey] = view
+
+    def flush(self, viewKey):
+        """Update analysis now if it was requested for this view, returns whether it did."""
+        with self.lock:
+            view = self.pending.pop(viewKey, None)
+        if view is None:
+            return False
+        view.update_analysis_and_wait()
+        return True
+
+    def flushIfIdle(self, viewKey, scheduler):
+        if scheduler.hasQueued(viewKey):
+            return False
+        return self.flush(viewKey)
+
+    def needsFlush(self, viewKey, scheduler):
+        """Whether an update is pending for viewKey with no run left to flush it."""
+        with self.lock:
+            if viewKey not in self.pending:
+                return False
+        return scheduler.isIdle(viewKey)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import re
+import codecs
+from collections import namedtuple
+
+SnippetHeader = namedtuple("SnippetHeader", ["description", "hotkey", "hasCode"])
+emptyHeader = SnippetHeader("", "", False)
+
+
+def readSnippetHeader(snippetPath):
+    """Parse only the description and hotkey lines, never reading the snippet body."""
+    try:
+        with codecs.open(snippetPath, 'r', 'utf-8') as snippetFile:
+            description = snippetFile.readline()
+            hotkey = snippetFile.readline()
+            # A single character after the header is enough to know there is code
+            hasCode = bool(hotkey) and bool(snippetFile.read(1))
+    except:
+        return emptyHeader
+    if not hasCode:
+        return emptyHeader
+    return SnippetHeader(description.strip()[1:].strip(), hotkey.strip()[1:], True)
+
+
+def readSnippetFile(snippetPath):
+    """Return (description, hotkey text, code) for a snippet, or empty strings if it has no code.
+
+    Only the editor and the runner need the body, everything else should use readSnippetHeader.
+    """
+    try:
+        with codecs.open(snippetPath, 'r', 'utf-8') as snippetFile:
+            description = snippetFile.readline()
+            hotkey = snippetFile.readline()
+            snippetCode = snippetFile.read()
+    except:
+        return ("", "", "")
+    if not snippetCode:
+        return ("", "", "")
+    return (description.strip()[1:].strip(), hotkey.strip()[1:], snippetCode)
+
+
+directivePattern = re.compile(r"^#\s*snippet:(.*)$")
+
+
+def parseDirectives(snippetCode):
+    """Collect `# snippet: key=value ...` options from the comment block at the top of a snippet body.
+
+    The first two lines of a snippet are reserved for the description and
+    hotkey, so per-snippet options live here instead, e.g.
+
+        # snippet: timeout=30 memory=512
+    """
+    directives = {}
+    for line in snippetCode.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("#"):
+            break
+        match = directivePattern.match(line)
+        if match:
+            for option in match.group(1).replace(",", " ").split():
+                (key, _, value) = option.partition("=")
+                directives[key.strip().lower()] = value.strip()
+    return directives
+
+
+def setDirective(snippetCode, key, value=None):
+    """Return snippetCode with directive `key` set to value, or removed if value is None.
+
+    Other directives and comments are kept as they are. A new directive is
+    added to the first `# snippet:` line, or to a new one at the very top.
+    """
+    lines = snippetCode.splitlines(True)
+    option = "%s=%s" % (key, value)
+    firstDirective = None
+    for (index, line) in enumerate(lines):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if not stripped.startswith("#"):
+            break
+        match = directivePattern.match(stripped)
+        if not match:
+            continue
+        options = match.group(1).replace(",", " ").split()
+        kept = [o for o in options if o.partition("=")[0].strip().lower() != key]
+        if firstDirective is None:
+            firstDirective = (index, options)
+        if len(kept) == len(options):
+            continue
+        if value is not None:
+            kept.append(option)
+        lines[index] = directiveLine(kept, line)
+        return "".join(lines)
+    if value is None:
+        return snippetCode
+    if firstDirective is not None:
+        (index, options) = firstDirective
+        lines[index] = directiveLine(options + [option], lines[index])
+        return "".join(lines)
+    return "# snippet: %s\n" % option + snippetCode
+
+
+def directiveLine(options, original):
+    if not options:
+        return ""
+    return "# snippet: " + " ".join(options) + (original[len(original.rstrip("\r\n")):] or "\n")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import ast
+from collections import namedtuple
+
+# mode is "none", "single" or "chunked", chunkSize only matters for chunked
+UndoPolicy = namedtuple("UndoPolicy", ["mode", "chunkSize"])
+defaultUndoPolicy = UndoPolicy("single", 0)
+
+
+def parseUndoPolicy(value):
+    """Parse an `undo=` directive: none, single (the default) or chunked:N."""
+    if not value:
+        return defaultUndoPolicy
+    (mode, _, size) = value.lower().partition(":")
+    if mode in ("none", "single") and not size:
+        return UndoPolicy(mode, 0)
+    if mode == "chunked" and size.isdigit() and int(size) > 0:
+        return UndoPolicy(mode, int(size))
+    raise ValueError(value)
+
+
+# BinaryView/Function methods that change the database
+mutatingMethods = frozenset([
+    "add_function", "create_user_function", "remove_function", "remove_user_function", "add_entry_point",
+    "define_data_var", "define_user_data_var", "undefine_data_var", "undefine_user_data_var",
+    "define_type", "define_user_type", "undefine_type", "undefine_user_type", "rename_type",
+    "define_auto_symbol", "define_user_symbol", "undefine_auto_symbol", "undefine_user_symbol",
+    "set_comment_at", "add_user_section", "remove_user_section", "add_user_segment", "remove_user_segment",
+    "add_tag", "remove_tag", "create_tag_type", "remove_tag_type", "add_user_data_ref", "remove_user_data_ref",
+    "add_user_code_ref", "remove_user_code_ref", "set_user_type", "set_auto_type", "set_user_instr_highlight",
+    "set_auto_instr_highlight", "set_call_stack_adjustment", "set_user_indirect_branches",
+    "create_user_stack_var", "delete_user_stack_var", "create_user_var", "delete_user_var",
+    "convert_to_nop", "always_branch", "never_branch", "invert_branch", "skip_and_return_value",
+    "store_metadata", "remove_metadata", "apply_debug_info", "apply_imported_types",
+])
+# Too common to flag unless they are called on the view itself
+viewMethods = frozenset(["write", "insert", "remove"])
+viewNames = frozenset(["bv", "current_view"])
+mutatingAttributes = frozenset([
+    "name", "type", "comment", "return_type", "calling_convention", "parameter_vars", "has_variable_arguments",
+    "can_return", "stack_adjustment", "clobbered_regs", "highlight",
+])
+
+
+def mutatingCalls(source):
+    """(line, what) for every call or attribute assignment in source that looks like it changes the database."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            method = node.func.attr
+            receiver = node.func.value
+            if method in mutatingMethods or (method in viewMethods and isinstance(receiver, ast.Name) and receiver.id in viewNames):
+                found.append((node.lineno, method + "()"))
+        elif isinstance(node, ast.Attribute) and isinstance(node.ctx, ast.Store) and node.attr in mutatingAttributes:
+            if not (isinstance(node.value, ast.Name) and node.value.id == "self"):
+                found.append((node.lineno, "." + node.attr + " ="))
+    return sorted(found)
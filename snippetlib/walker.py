@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import re
+import fnmatch
+
+ignoreFileName = ".snippetignore"
+# Version control and cache folders, including the ones this plugin writes,
+# are never worth descending into. Anything else goes in .snippetignore.
+defaultIgnore = [".git", ".hg", ".svn", "__pycache__", ".snippetcache", ".profiles", ".mypy_cache", ".pytest_cache"]
+
+
+def loadIgnorePatterns(root):
+    """Default ignores plus the glob patterns (one per line, # comments) in root/.snippetignore."""
+    patterns = list(defaultIgnore)
+    try:
+        with open(os.path.join(root, ignoreFileName), encoding="utf-8") as ignoreFile:
+            for line in ignoreFile:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    patterns.append(line.rstrip("/"))
+    except OSError:
+        pass
+    return patterns
+
+
+def compileIgnorePatterns(patterns):
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+def walkSnippets(root, extensions=(".py",), ignore=None, maxDepth=None):
+    """Yield an os.DirEntry for every snippet file below root.
+
+    Ignored directories are pruned before they are opened. A pattern matches
+    either the entry name or its path relative to root (using "/"). Entries
+    cache their stat result, so callers should use entry.stat() rather than
+    stat the path again.
+    """
+    if ignore is None:
+        ignore = loadIgnorePatterns(root)
+    ignored = compileIgnorePatterns(ignore)
+    pending = [(root, "", 0)]
+    while pending:
+        (directory, relDir, depth) = pending.pop()
+        try:
+            scanner = os.scandir(directory)
+        except OSError:
+            continue
+        with scanner:
+            for entry in scanner:
+                relPath = relDir + entry.name
+                if ignored is not None and (ignored.match(entry.name) or ignored.match(relPath)):
+                    continue
+                try:
+                    isDir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if isDir:
+                    if maxDepth is None or depth < maxDepth:
+                        pending.append((entry.path, relPath + "/", depth + 1))
+                elif os.path.splitext(entry.name)[1] in extensions:
+                    yield entry
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+import ctypes
+import threading
+import tracemalloc
+
+
+class SnippetAborted(BaseException):
+    """Raised inside a snippet's thread to stop it. BaseException so `except Exception` can't swallow it."""
+    outcome = "aborted"
+
+
+class SnippetCancelled(SnippetAborted):
+    outcome = "cancelled"
+
+
+class SnippetTimeout(SnippetAborted):
+    outcome = "timeout"
+
+
+class SnippetMemoryExceeded(SnippetAborted):
+    outcome = "memory"
+
+
+# tracemalloc is process wide, only stop it once the last watchdog using it is done
+tracingLock = threading.Lock()
+tracingUsers = 0
+
+
+def startTracing():
+    global tracingUsers
+    with tracingLock:
+        if tracingUsers == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            tracingUsers = 1
+        elif tracingUsers > 0:
+            tracingUsers += 1
+        else:
+            # Someone else is tracing, leave it alone
+            return False
+    return True
+
+
+def stopTracing():
+    global tracingUsers
+    with tracingLock:
+        tracingUsers -= 1
+        if tracingUsers == 0:
+            tracemalloc.stop()
+
+
+class WatchdogMonitor:
+    """The one thread that polls every armed Watchdog, idle while there are none."""
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.watchdogs = set()
+        self.thread = None
+
+    def add(self, watchdog):
+        with self.condition:
+            self.watchdogs.add(watchdog)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.watch, name="Snippet watchdog", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def remove(self, watchdog):
+        with self.condition:
+            self.watchdogs.discard(watchdog)
+
+    def watch(self):
+        while True:
+            with self.condition:
+                while not self.watchdogs:
+                    self.condition.wait()
+            time.sleep(self.interval)
+            with self.condition:
+                watchdogs = list(self.watchdogs)
+            for watchdog in watchdogs:
+                watchdog.poll()
+
+
+monitor = WatchdogMonitor()
+
+
+class Watchdog:
+    """Stop the thread that created it if it is cancelled or runs over budget.
+
+    The abort is delivered as an asynchronous exception, so it lands at the
+    next Python bytecode the snippet executes; a long call into the core
+    finishes first. The memory budget is measured with tracemalloc and so
+    counts every allocation made while the snippet runs, on any thread.
+    With trackPeak (or a memory budget) the peak allocation above the
+    starting point is left in `peak` afterwards; overlapping runs share
+    tracemalloc's peak so it is only approximate for those. All watchdogs
+    are polled by one shared thread. With interrupt=False nothing is raised,
+    the caller checks `fired` itself.
+
+        Watchdog(lambda: task.cancelled, timeLimit=30).run(exec, code, snippetGlobals)
+    """
+
+    def __init__(self, isCancelled=None, timeLimit=None, memoryLimit=None, trackPeak=False, interrupt=True):
+        self.threadId = threading.get_ident()
+        self.isCancelled = isCancelled
+        self.timeLimit = timeLimit
+        self.memoryLimit = memoryLimit
+        self.trackPeak = trackPeak
+        self.interrupt = interrupt
+        self.peak = None
+        self.lock = threading.Lock()
+        self.armed = False
+        self.closed = False
+        self.fired = None
+        self.tracing = False
+
+    def __enter__(self):
+        if self.memoryLimit or self.trackPeak:
+            self.tracing = startTracing()
+            self.baseline = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        self.started = time.monotonic()
+        self.armed = True
+        if self.isCancelled is not None or self.timeLimit or self.memoryLimit:
+            monitor.add(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def run(self, function, *args):
+        """Call function(*args) under the watchdog.
+
+        An abort that only lands once function has returned, e.g. in the
+        middle of __exit__, is dropped: the run did finish.
+        """
+        finished = False
+        try:
+            with self:
+                function(*args)
+                finished = True
+        except SnippetAborted:
+            if not finished:
+                raise
+        finally:
+            self.close()
+
+    def disarm(self):
+        # The abort can still land while this runs, in which case it goes around
+        # again and the second time round there is nothing left to deliver
+        while True:
+            try:
+                monitor.remove(self)
+                with self.lock:
+                    self.armed = False
+                    if self.fired is not None and self.interrupt:
+                        # Drop the abort if it has not been delivered yet
+                        ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.threadId), None)
+                return
+            except SnippetAborted:
+                continue
+
+    def close(self):
+        self.disarm()
+        if self.closed:
+            return
+        self.closed = True
+        if (self.memoryLimit or self.trackPeak) and tracemalloc.is_tracing():
+            self.peak = max(0, tracemalloc.get_traced_memory()[1] - self.baseline)
+        if self.tracing:
+            stopTracing()
+
+    def check(self):
+        if self.isCancelled is not None and self.isCancelled():
+            return SnippetCancelled("cancelled")
+        if self.timeLimit and time.monotonic() - self.started > self.timeLimit:
+            return SnippetTimeout("exceeded its time budget of %ss" % self.timeLimit)
+        if self.memoryLimit and tracemalloc.is_tracing():
+            used = tracemalloc.get_traced_memory()[0] - self.baseline
+            if used > self.memoryLimit:
+                return SnippetMemoryExceeded("exceeded its memory budget of %d MiB" % (self.memoryLimit // (1024 * 1024)))
+        return None
+
+    def poll(self):
+        """Called by the monitor, fires the abort at most once."""
+        try:
+            reason = self.check()
+        except Exception:
+            reason = None
+        if reason is None:
+            return
+        monitor.remove(self)
+        with self.lock:
+            if self.armed and self.fired is None:
+                self.fired = reason
+                if self.interrupt:
+                    ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.threadId), ctypes.py_object(type(reason)))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Runs without Binary Ninja, against a small stand-in namespace:
+#
+#   python3 -m unittest discover tests
+
+import os
+import sys
+import unittest
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from snippetlib.completion import SnippetCompleter
+
+
+class Function:
+    @property
+    def name(self) -> str:
+        return ""
+
+    def get_basic_block_at(self, address):
+        return None
+
+
+class FunctionList:
+    def count_matching(self):
+        return 0
+
+
+class BinaryView:
+    @property
+    def functions(self) -> "FunctionList":
+        return FunctionList()
+
+    @property
+    def entry_function(self) -> Function:
+        return Function()
+
+    @property
+    def sections(self) -> List[str]:
+        return []
+
+    @property
+    def unannotated(self):
+        return None
+
+    def get_functions_at(self, address):
+        return []
+
+
+namespace = {"BinaryView": BinaryView, "Function": Function, "FunctionList": FunctionList, "current_thing": 1}
+
+
+def candidates(line):
+    completer = SnippetCompleter(lambda: namespace)
+    texts = []
+    while True:
+        text = completer.complete(line, len(texts))
+        if text is None:
+            return texts
+        texts.append(text)
+
+
+class CompletionTest(unittest.TestCase):
+
+    def testGlobalName(self):
+        self.assertIn("current_thing", candidates("current_th"))
+        self.assertIn("len(", candidates("le"))
+
+    def testAfterOpenParen(self):
+        self.assertEqual(candidates("print(current_th"), ["print(current_thing"])
+        self.assertIn("x = len(bv", candidates("x = len(bv"))
+        self.assertIn("foo(bar, bv.get_functions_at(", candidates("foo(bar, bv.get_"))
+
+    def testCallableContextGlobal(self):
+        self.assertEqual(candidates("flush_an"), ["flush_analysis("])
+        self.assertIn("bv", candidates("bv"))
+        self.assertNotIn("bv(", candidates("bv"))
+
+    def testContextGlobal(self):
+        texts = candidates("bv.")
+        self.assertIn("bv.functions", texts)
+        self.assertIn("bv.get_functions_at(", texts)
+
+    def testPropertyAnnotatedWithName(self):
+        self.assertEqual(candidates("bv.functions."), ["bv.functions.count_matching("])
+
+    def testPropertyAnnotatedWithClass(self):
+        self.assertIn("bv.entry_function.get_basic_block_at(", candidates("bv.entry_function.g"))
+
+    def testPropertyAnnotatedWithGeneric(self):
+        self.assertIn("bv.sections.append(", candidates("bv.sections.app"))
+
+    def testUnannotatedPropertyStops(self):
+        self.assertEqual(candidates("bv.unannotated."), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# Needs pygments, not Binary Ninja:
+#
+#   python3 -m unittest discover tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from pygments.lexers import PythonLexer
+from pygments.token import Name, Number, String
+from snippetlib.lexing import LineLexer
+
+
+def lexLines(text):
+    """[(spans, outgoing state)] per line of text."""
+    lexer = LineLexer(PythonLexer())
+    state = 0
+    lines = []
+    for line in text.split("\n"):
+        (spans, state) = lexer.lexLine(line, state)
+        lines.append((line, spans, state))
+    return lines
+
+
+def tokens(line, spans):
+    return [(line[start:start + length], token) for (start, length, token) in spans if line[start:start + length].strip()]
+
+
+class LineLexerTest(unittest.TestCase):
+
+    def testUnterminatedStringEndsWithItsLine(self):
+        ((_, _, firstState), (line, spans, state)) = lexLines('x = "abc\ny = 1')
+        self.assertEqual(firstState, 0)
+        self.assertEqual(state, 0)
+        found = tokens(line, spans)
+        self.assertIn("y", [value for (value, token) in found if token in Name])
+        self.assertIn("1", [value for (value, token) in found if token in Number])
+
+    def testTripleQuotedStringSpansLines(self):
+        lines = lexLines('x = """abc\ndef\n"""\ny = 1')
+        self.assertNotEqual(lines[0][2], 0)
+        (line, spans, _) = lines[1]
+        self.assertEqual([token in String for (_, token) in tokens(line, spans)], [True])
+        self.assertEqual(lines[2][2], 0)
+        (line, spans, _) = lines[3]
+        self.assertIn(("y", Name), tokens(line, spans))
+
+
+if __name__ == "__main__":
+    unittest.main()